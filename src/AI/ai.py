@@ -1,179 +1,652 @@
-import numpy as np
+import os
 import time
-from Board.board import Board
-from piece.pawn import Pawn
-from piece.king import King
-from piece.bishop import Bishop
-from piece.knight import Knight
-from piece.queen import Queen
-from piece.rook import Rook
+from Board.evaluation import PIECE_VALUES, compute_score
+from Board.position import Position
+from Board.zobrist import SIDE_KEY, square_index
+from .batch_eval import evaluate_children
+from .bitbase import Bitbases, MAX_DISTANCE, MAX_PIECES, WIN, LOSS, DRAW
+from .lazy_smp import LazySMP
+from .move_ordering import MoveOrderer, MAX_PLY
+from .opening_book import OpeningBook
+from .transposition import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+
+# Profundidade máxima do aprofundamento iterativo quando a busca tem orçamento de tempo ou de nós
+MAX_SEARCH_DEPTH = 32
+# O orçamento é verificado uma vez a cada BUDGET_CHECK_INTERVAL + 1 nós
+BUDGET_CHECK_INTERVAL = 0xFF
+# Folga da poda delta na quiescência (dois peões)
+DELTA_MARGIN = 20
+# Poda do lance nulo: redução de profundidade e profundidade mínima para tentá-la
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_MIN_DEPTH = 3
+# Redução das jogadas tardias: jogadas buscadas sem redução, profundidade mínima e redução
+LMR_FULL_MOVES = 3
+LMR_MIN_DEPTH = 3
+LMR_REDUCTION = 1
+# Poda de futilidade nos últimos FUTILITY_DEPTH níveis, com folga de FUTILITY_MARGIN por nível
+FUTILITY_DEPTH = 2
+FUTILITY_MARGIN = 15
+PRUNING_STATS = ("null_move", "reductions", "re_searches", "futility", "reverse_futility")
+# As pontuações são múltiplas de meio ponto, então esta é a menor janela possível (janela nula)
+NULL_WINDOW = 0.5
+# Meia largura inicial da janela de aspiração (meio peão); a cada falha ela é multiplicada por
+# ASPIRATION_GROWTH até passar de ASPIRATION_MAX_WINDOW, quando a janela fica infinita
+ASPIRATION_WINDOW = 5
+ASPIRATION_GROWTH = 4
+ASPIRATION_MAX_WINDOW = 200
+# Pontuação de uma vitória das tabelas de finais (abaixo do valor do rei, que ainda pode ser capturado na busca)
+BITBASE_WIN = 500
+# Com as distâncias das tabelas, cada meio-lance a menos até o mate vale DISTANCE_WEIGHT
+DISTANCE_WEIGHT = 0.5
+# Pontuação de um mate encontrado na busca, acima de qualquer vitória das tabelas; cada meio-lance a mais
+# até ele vale um ponto a menos, para a busca escolher o mate mais rápido
+MATE_SCORE = 2000
+BITBASE_KINDS = {"King": 'K', "Queen": 'Q', "Rook": 'R', "Bishop": 'B', "Knight": 'N', "Pawn": 'P'}
+
+
+def pv_to_text(pv):
+    """Escreve a linha principal em notação de coordenadas, como "e2e4 e7e5"."""
+    def square_name(square):
+        return 'abcdefgh'[square[0]] + '87654321'[square[1]]
+    return " ".join(square_name(initial_pos) + square_name(move) for initial_pos, move in pv)
+
+
+class SearchAborted(Exception):
+    """Interrompe a busca quando o orçamento de tempo ou de nós se esgota."""
 
 
 class Ai:
-    def __init__(self, ai_game, depth):
-        """Inicializa a classe AI com a profundidade máxima de busca e a referência ao jogo."""
+    def __init__(self, ai_game, depth, tt_size_mb=16, move_ordering=True, quiescence=True, threads=1,
+                 transposition_table=None, book_path=None, book_random=True, bitbase_path=None,
+                 check_evaluation=False, batch_eval=False, null_move=True, lmr=True, futility=True,
+                 pvs=True, aspiration=True, check_unmake=False, contempt=0):
+        """Inicializa a classe AI com a profundidade máxima de busca e a referência ao jogo.
+
+        Com threads > 1 as buscas são feitas em paralelo (Lazy SMP) por processos que compartilham a
+        tabela de transposição. Se book_path apontar para um livro Polyglot, ele é consultado antes da
+        busca; book_random sorteia entre as jogadas do livro pelo peso em vez de escolher a de maior peso.
+        bitbase_path é o diretório das tabelas de finais geradas por AI.bitbase, consultadas quando restam
+        poucas peças. check_evaluation confere a avaliação incremental com o cálculo completo e check_unmake
+        confere que cada jogada desfeita deixa o tabuleiro idêntico ao de antes dela (depuração).
+        batch_eval avalia em lote, com NumPy, as folhas dos nós de profundidade 1 quando a quiescência está
+        desligada. null_move, lmr e futility ligam a poda do lance nulo, a redução das jogadas tardias e a
+        poda de futilidade (inclusive a reversa). pvs busca as jogadas depois da primeira com janela nula
+        (principal variation search) e aspiration começa cada iteração com uma janela estreita em volta da
+        pontuação da anterior. Uma posição repetida na busca vale empate, pontuado com -contempt do ponto de
+        vista da IA: com contempt positivo ela evita repetir as jogadas.
+        """
         self.depth = depth
         self.ai_game = ai_game
         self.moves = []
-        self.piece_values = {
-            Pawn: 10,
-            Knight: 30,
-            Bishop: 30,
-            Rook: 50,
-            Queen: 90,
-            King: 1000,
-        }
-
-
-    def minimax_alpha_beta(self, board, depth, alpha, beta, maximizing_player):
-        """Executa o algoritmo MiniMax com poda alpha-beta para avaliar posições de tabuleiro."""
+        self.threads = threads
+        self.book = None
+        if book_path is not None and os.path.exists(book_path):
+            self.book = OpeningBook(book_path)
+        self.book_random = book_random
+        self.bitbases = Bitbases(bitbase_path)
+        self.lazy_smp = None
+        if threads > 1:
+            self.lazy_smp = LazySMP(threads, depth, tt_size_mb,
+                                    {"move_ordering": move_ordering, "quiescence": quiescence,
+                                     "bitbase_path": bitbase_path, "null_move": null_move, "lmr": lmr,
+                                     "futility": futility, "pvs": pvs, "aspiration": aspiration,
+                                     "contempt": contempt})
+        # A tabela de transposição é mantida entre as chamadas de get_best_move durante o jogo
+        if transposition_table is None:
+            transposition_table = TranspositionTable(tt_size_mb if threads == 1 else 0)
+        self.tt = transposition_table
+        # Posição da busca, mantida entre as jogadas e atualizada com play_move
+        self.position = None
+        self.tt_color = None
+        self.use_quiescence = quiescence
+        self.nodes = 0
+        self.qnodes = 0
+        self.delta_prunes = 0
+        self.completed_depth = 0
+        self.best_eval = 0
+        self.search_time = 0
+        self.deadline = None
+        self.node_limit = None
+        self.stop_event = None
+        self.can_stop = False
+        self.check_evaluation = check_evaluation
+        self.check_unmake = check_unmake
+        self.batch_eval = batch_eval
+        self.null_move = null_move
+        self.lmr = lmr
+        self.futility = futility
+        self.pruning_stats = dict.fromkeys(PRUNING_STATS, 0)
+        self.pvs = pvs
+        self.aspiration = aspiration
+        self.aspiration_researches = 0
+        self.contempt = contempt
+        # Tabela triangular da linha principal: a linha do nível ply fica em pv_table[ply][ply:pv_length[ply]]
+        self.pv_table = [[None] * MAX_PLY for _ in range(MAX_PLY)]
+        self.pv_length = [0] * MAX_PLY
+        self.pv = []
+        self.piece_values = dict(PIECE_VALUES)
+        self.move_orderer = MoveOrderer(self.piece_values, enabled=move_ordering)
+
+
+    def minimax_alpha_beta(self, board, depth, alpha, beta, maximizing_player, ply=1, allow_null=True):
+        """Executa o algoritmo MiniMax com poda alpha-beta para avaliar posições de tabuleiro.
+
+        allow_null é False logo depois de um lance nulo, para não fazer dois seguidos.
+        """
         
-        if depth == 0:
-            return self.evaluate_board(board)
+        self.nodes += 1
+        if self.can_stop and not self.nodes & BUDGET_CHECK_INTERVAL and self._out_of_budget():
+            raise SearchAborted()
+        self.pv_length[ply] = ply
+
+        # A repetição precisa de pelo menos quatro lances reversíveis desde o último irreversível
+        if board.fifty_movements >= 4 and board.repetitions():
+            return -self.contempt
+
         player1 = board.turn
         player2 = 'w' if player1 == 'b' else 'b'
+        color = player1 if maximizing_player else player2
+        # Empates das tabelas encerram o ramo. Vitórias também, se as tabelas têm as distâncias até o mate;
+        # sem elas só no horizonte, para a busca ainda achar o caminho do mate
+        result, distance = self._probe_bitbases(board, color)
+        if result is not None and (result == DRAW or depth <= 1 or distance is not None):
+            return self._bitbase_score(board, result, distance, maximizing_player, color, ply)
+
+        if depth == 0:
+            if self.use_quiescence:
+                return self.quiescence(board, alpha, beta, maximizing_player, ply)
+            return self.evaluate_board(board)
+
+        alpha_orig, beta_orig = alpha, beta
+        hash_move = None
+        entry = self.tt.probe(board.zobrist_key)
+        if entry is not None:
+            tt_depth, tt_flag, tt_score, hash_move = entry
+            if tt_depth >= depth:
+                if tt_flag == EXACT:
+                    self.tt.record_cutoff()
+                    return tt_score
+                if tt_flag == LOWER_BOUND:
+                    alpha = max(alpha, tt_score)
+                else:
+                    beta = min(beta, tt_score)
+                if beta <= alpha:
+                    self.tt.record_cutoff()
+                    return tt_score
+
+        # O xeque só é verificado nos nós onde alguma poda pode ser aplicada
+        in_check = None
+        if depth >= NULL_MOVE_MIN_DEPTH and (self.null_move or self.lmr):
+            in_check = self._in_check(board, color)
+            if self.null_move and allow_null and not in_check:
+                eval = self._null_move_search(board, depth, alpha, beta, maximizing_player, ply, color)
+                if eval is not None:
+                    return eval
+
+        futile = False
+        if self.futility and depth <= FUTILITY_DEPTH:
+            static_eval = self.evaluate_board(board)
+            margin = FUTILITY_MARGIN * depth
+            # Poda de futilidade reversa: mesmo com a folga o jogador da vez já passa do limite do adversário
+            if maximizing_player and static_eval - margin >= beta and not self._in_check(board, color):
+                self.pruning_stats["reverse_futility"] += 1
+                return static_eval - margin
+            if not maximizing_player and static_eval + margin <= alpha and not self._in_check(board, color):
+                self.pruning_stats["reverse_futility"] += 1
+                return static_eval + margin
+            # Poda de futilidade: jogadas quietas não conseguem trazer a pontuação de volta à janela
+            futile = ((maximizing_player and static_eval + margin <= alpha)
+                      or (not maximizing_player and static_eval - margin >= beta))
+            futile = futile and not self._in_check(board, color)
+
+        moves = self.move_orderer.order(board, board.get_specific_legal_moves(color), ply, hash_move)
+        if depth == 1 and moves and self._can_batch_frontier(board):
+            best_eval, best_move = self._evaluate_frontier(board, moves, alpha, beta, maximizing_player, ply)
+        else:
+            best_eval, best_move = self._search_moves(board, moves, depth, alpha, beta, maximizing_player, ply,
+                                                      bool(in_check), futile)
+
+        if best_eval <= alpha_orig:
+            flag = UPPER_BOUND
+        elif best_eval >= beta_orig:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.tt.store(board.zobrist_key, depth, flag, best_eval, best_move)
+        return best_eval
+
+    def _search_moves(self, board, moves, depth, alpha, beta, maximizing_player, ply, in_check=False, futile=False):
+        """Busca as jogadas em ordem até um corte beta e retorna (pontuação, melhor jogada).
+
+        Com futile as jogadas quietas depois da primeira são podadas; fora do xeque, as jogadas quietas
+        tardias são buscadas com profundidade reduzida e só voltam à profundidade cheia se melhorarem a janela.
+        Com pvs as jogadas depois da primeira são buscadas com janela nula e só são buscadas de novo com a
+        janela inteira se a melhorarem.
+        """
+        best_eval = float('-inf') if maximizing_player else float('inf')
+        best_move = None
+        for move_number, (piece, move) in enumerate(moves):
+            from_square = piece.square
+            quiet = board.square[move] is None and not (piece.kind == "Pawn" and move[1] in (0, 7))
+            if futile and quiet and move_number > 0:
+                self.pruning_stats["futility"] += 1
+                continue
+            reduce = (self.lmr and quiet and not in_check and depth >= LMR_MIN_DEPTH
+                      and move_number >= LMR_FULL_MOVES)
+            board.fake_push((piece, move))
+            if move_number == 0 or not (self.pvs or reduce):
+                eval = self.minimax_alpha_beta(board, depth - 1, alpha, beta, not maximizing_player, ply + 1)
+            else:
+                # Janela nula logo acima de alpha (ou abaixo de beta): só diz se a jogada melhora a janela
+                if maximizing_player:
+                    window = (alpha, alpha + NULL_WINDOW) if self.pvs else (alpha, beta)
+                else:
+                    window = (beta - NULL_WINDOW, beta) if self.pvs else (alpha, beta)
+                new_depth = depth - 1
+                if reduce:
+                    self.pruning_stats["reductions"] += 1
+                    new_depth -= LMR_REDUCTION
+                eval = self.minimax_alpha_beta(board, new_depth, *window, not maximizing_player, ply + 1)
+                improves = eval > alpha if maximizing_player else eval < beta
+                if improves and reduce:
+                    self.pruning_stats["re_searches"] += 1
+                    eval = self.minimax_alpha_beta(board, depth - 1, *window, not maximizing_player, ply + 1)
+                    improves = eval > alpha if maximizing_player else eval < beta
+                if improves and self.pvs and alpha < eval < beta:
+                    eval = self.minimax_alpha_beta(board, depth - 1, alpha, beta, not maximizing_player, ply + 1)
+            board.fake_pop()
+            if maximizing_player:
+                if eval > best_eval:
+                    best_eval = eval
+                    best_move = (square_index(from_square), square_index(move))
+                if eval > alpha:
+                    self._update_pv(ply, (from_square, move))
+                    alpha = eval
+            else:
+                if eval < best_eval:
+                    best_eval = eval
+                    best_move = (square_index(from_square), square_index(move))
+                if eval < beta:
+                    self._update_pv(ply, (from_square, move))
+                    beta = eval
+            if beta <= alpha:
+                self.move_orderer.record_cutoff(board, piece, move, ply, depth, move_number)
+                break
+        return best_eval, best_move
+
+    def _update_pv(self, ply, move):
+        """Faz da jogada o começo da linha principal do nível ply, seguida da linha do nível seguinte."""
+        row = self.pv_table[ply]
+        row[ply] = move
+        length = max(self.pv_length[ply + 1], ply + 1)
+        row[ply + 1:length] = self.pv_table[ply + 1][ply + 1:length]
+        self.pv_length[ply] = length
+
+    def _null_move_search(self, board, depth, alpha, beta, maximizing_player, ply, color):
+        """Passa a vez ao adversário e busca com profundidade reduzida e janela nula.
+
+        Se nem assim o adversário consegue voltar para a janela, a posição é boa demais e o nó é cortado:
+        retorna o limite da janela, ou None se o corte não acontecer. Não é tentado quando o jogador da vez só
+        tem rei e peões, onde o zugzwang é comum.
+        """
+        bound = beta if maximizing_player else alpha
+        if bound in (float('inf'), float('-inf')) or not self._has_pieces(board, color):
+            return None
+        # Só a vez muda: a chave troca de lado e o tabuleiro fica como está. A chave de antes entra no
+        # histórico, como em qualquer jogada, e o contador zerado faz a busca de repetições parar no lance
+        # nulo, que não é uma jogada de verdade
+        fifty_movements = board.fifty_movements
+        board.history.append(board.zobrist_key)
+        board.zobrist_key ^= SIDE_KEY
+        board.fifty_movements = 0
+        try:
+            if maximizing_player:
+                eval = self.minimax_alpha_beta(board, depth - 1 - NULL_MOVE_REDUCTION, beta - NULL_WINDOW, beta,
+                                               False, ply + 1, False)
+            else:
+                eval = self.minimax_alpha_beta(board, depth - 1 - NULL_MOVE_REDUCTION, alpha, alpha + NULL_WINDOW,
+                                               True, ply + 1, False)
+        finally:
+            board.fifty_movements = fifty_movements
+            board.zobrist_key ^= SIDE_KEY
+            board.history.pop()
+        if (maximizing_player and eval >= beta) or (not maximizing_player and eval <= alpha):
+            self.pruning_stats["null_move"] += 1
+            return bound
+        return None
+
+    def _in_check(self, board, color):
+        """Retorna True se o rei da cor está em xeque (ou já foi capturado na busca)."""
+        return board.in_check(color)
+
+    def _has_pieces(self, board, color):
+        """Retorna True se a cor tem alguma peça além do rei e dos peões."""
+        pieces = board.white_pieces if color == 'w' else board.black_pieces
+        return any(piece.kind not in ("Pawn", "King") for piece in pieces)
+
+    def _can_batch_frontier(self, board):
+        """Retorna True se as filhas de um nó de profundidade 1 podem ser avaliadas em lote.
+
+        Só quando elas são folhas de verdade: sem quiescência, sem posições que as tabelas de finais
+        poderiam resolver e sem filhas que possam repetir uma posição, que valem -contempt em
+        minimax_alpha_beta (a filha chega com fifty_movements + 1 e a repetição precisa de quatro).
+        """
+        if not self.batch_eval or self.use_quiescence or board.fifty_movements >= 3:
+            return False
+        return not self.bitbases.tables or len(board.white_pieces) + len(board.black_pieces) > MAX_PIECES + 1
+
+    def _evaluate_frontier(self, board, moves, alpha, beta, maximizing_player, ply):
+        """Avalia todas as filhas de um nó de profundidade 1 de uma vez e retorna (pontuação, melhor jogada)."""
+        scores = evaluate_children(board, moves)
+        self.nodes += len(moves)
+        if self.can_stop and self._out_of_budget():
+            raise SearchAborted()
+        index = int(scores.argmax() if maximizing_player else scores.argmin())
+        best_eval = float(scores[index])
+        piece, move = moves[index]
+        if (maximizing_player and best_eval > alpha) or (not maximizing_player and best_eval < beta):
+            self.pv_length[ply + 1] = ply + 1
+            self._update_pv(ply, (piece.square, move))
+        if (maximizing_player and best_eval >= beta) or (not maximizing_player and best_eval <= alpha):
+            self.move_orderer.record_cutoff(board, piece, move, ply, 1, index)
+        return best_eval, (square_index(piece.square), square_index(move))
+
+    def quiescence(self, board, alpha, beta, maximizing_player, ply):
+        """Estende a busca no horizonte com capturas e promoções até a posição ficar quieta.
+
+        A avaliação estática (stand pat) serve de limite inferior para o jogador da vez, e capturas que não
+        conseguem levar a pontuação até a janela nem com DELTA_MARGIN de folga são podadas (delta pruning).
+        """
+        self.nodes += 1
+        self.qnodes += 1
+        if self.can_stop and not self.nodes & BUDGET_CHECK_INTERVAL and self._out_of_budget():
+            raise SearchAborted()
+
+        stand_pat = self.evaluate_board(board)
         if maximizing_player:
-            legal_moves = board.get_specific_legal_moves(player1)
-            max_eval = float('-inf')
-            for piece, possible_moves in legal_moves:
-                for move in possible_moves:
-                    board.fake_push((piece, move))
-                    eval = self.minimax_alpha_beta(board, depth - 1, alpha, beta, False)
-                    max_eval = max(max_eval, eval)
-                    alpha = max(alpha, eval)
-                    board.fake_pop()
-                    if beta <= alpha:
-                        return max_eval
-            return max_eval
+            if stand_pat >= beta:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
         else:
-            min_eval = float('inf')
-            legal_moves = board.get_specific_legal_moves(player2)
-
-            for piece, possible_moves in legal_moves:
-                for move in possible_moves:
-                    board.fake_push((piece, move))
-                    eval = self.minimax_alpha_beta(board, depth - 1, alpha, beta, True)
-                    min_eval = min(min_eval, eval)
-                    beta = min(beta, eval)
+            if stand_pat <= alpha:
+                return stand_pat
+            beta = min(beta, stand_pat)
+
+        color = board.turn if maximizing_player else ('w' if board.turn == 'b' else 'b')
+        best_eval = stand_pat
+        for piece, move in self.move_orderer.order(board, board.get_specific_legal_moves(color), ply):
+            victim = board.square[move]
+            gain = 0 if victim is None else self.piece_values[victim.kind]
+            if piece.kind == "Pawn" and move[1] in (0, 7):
+                gain += self.piece_values["Queen"] - self.piece_values["Pawn"]
+            elif victim is None:
+                continue
+            if ((maximizing_player and stand_pat + gain + DELTA_MARGIN <= alpha)
+                    or (not maximizing_player and stand_pat - gain - DELTA_MARGIN >= beta)):
+                self.delta_prunes += 1
+                continue
+            board.fake_push((piece, move))
+            eval = self.quiescence(board, alpha, beta, not maximizing_player, ply + 1)
+            board.fake_pop()
+            if maximizing_player:
+                best_eval = max(best_eval, eval)
+                alpha = max(alpha, eval)
+            else:
+                best_eval = min(best_eval, eval)
+                beta = min(beta, eval)
+            if beta <= alpha:
+                break
+        return best_eval
+
+    def reset_position(self, fen, color=None, history=()):
+        """Recria a posição da IA a partir do FEN; color substitui o lado a jogar do FEN.
+
+        history é a lista das chaves Zobrist das posições do jogo antes desta, para reconhecer as repetições.
+        """
+        self.position = Position.from_FEN(fen, color, history)
+
+    def play_move(self, initial_pos, move):
+        """Aplica à posição da IA uma jogada feita no jogo, por qualquer um dos jogadores."""
+        self.position.play(initial_pos, move)
+
+    def get_best_move(self, fen, color, time_limit=None, node_limit=None, stop_event=None,
+                      start_depth=1, max_depth=None, history=()):
+        """Obtém a melhor jogada possível para o estado atual do FEN.
+
+        Com fen=None a busca é feita na posição mantida pela IA, atualizada com play_move a cada jogada
+        do jogo; um FEN recria essa posição (com history) antes da busca, como reset_position.
+
+        A busca é feita por aprofundamento iterativo, um nível por vez, de start_depth até max_depth
+        (self.depth por padrão). Se time_limit (segundos) ou node_limit forem informados e max_depth não,
+        a busca continua até o orçamento acabar e retorna a jogada da última iteração completa. stop_event
+        (qualquer objeto com is_set(), como threading.Event) interrompe a busca da mesma forma quando é ativado.
+        history é a lista das chaves Zobrist das posições do jogo antes desta, para reconhecer as repetições.
+
+        Retorna (casa inicial, casa final, linha principal), onde a linha principal é a lista de jogadas
+        (casa inicial, casa final) esperadas a partir da posição, começando pela jogada retornada.
+        """
+        if fen is not None:
+            self.reset_position(fen, color, history)
+        board = self.position
+        if self.book is not None or self.lazy_smp is not None:
+            fen = board.to_FEN()
+
+        book_move = self._get_book_move(fen, color)
+        if book_move is not None:
+            return book_move
+
+        if self.lazy_smp is not None:
+            move = self.lazy_smp.get_best_move(fen, color, time_limit, node_limit, stop_event, list(board.history))
+            self.nodes = self.lazy_smp.nodes
+            self.completed_depth = self.lazy_smp.completed_depth
+            self.best_eval = self.lazy_smp.best_eval
+            self.pv = move[2] if move else []
+            return move
+
+        board.verify = self.check_unmake
+        # As pontuações da tabela são do ponto de vista da cor que a IA joga
+        if color != self.tt_color:
+            self.tt.clear()
+            self.tt_color = color
+        self.tt.new_search()
+        self.move_orderer.new_search()
+
+        has_budget = time_limit is not None or node_limit is not None
+        if max_depth is None:
+            max_depth = MAX_SEARCH_DEPTH if has_budget else self.depth
+        self.deadline = None if time_limit is None else time.perf_counter() + time_limit
+        self.node_limit = node_limit
+        self.stop_event = stop_event
+        self.nodes = 0
+        self.qnodes = 0
+        self.delta_prunes = 0
+        self.pruning_stats = dict.fromkeys(PRUNING_STATS, 0)
+        self.aspiration_researches = 0
+        self.completed_depth = 0
+        self.can_stop = False
+        start_time = time.perf_counter()
+
+        root_moves = [(piece, piece.square, move) for piece, move
+                      in self.move_orderer.order(board, board.get_legal_moves(), 0)]
+        if not root_moves:
+            return None
+        root_moves = self._filter_root_moves(board, root_moves)
+        best_move = root_moves[0]
+        self.pv = [(best_move[1], best_move[2])]
+        root_ply = board.ply
+
+        for depth in range(start_depth, max_depth + 1):
+            try:
+                best_move, self.best_eval, self.pv = self._aspiration_search(board, depth, root_moves)
+            except SearchAborted:
+                while board.ply > root_ply:
                     board.fake_pop()
-                    if beta <= alpha:
-                        return min_eval
-            return min_eval
+                break
+            self.completed_depth = depth
+            # A melhor jogada desta iteração é a primeira a ser buscada na próxima
+            root_moves.remove(best_move)
+            root_moves.insert(0, best_move)
+            # Depois da primeira iteração sempre há uma jogada para retornar
+            self.can_stop = True
+            if self._out_of_budget():
+                break
 
-    def get_best_move(self, fen, color):
-        """Obtém a melhor jogada possível para o estado atual do FEN."""
-        
-        board = Board(self.ai_game)
-        board._init_from_FEN(fen)
-        board.turn = color
+        self.search_time = time.perf_counter() - start_time
+        _, initial_pos, move = best_move
+        return initial_pos, move, self.pv
+
+    def _get_book_move(self, fen, color):
+        """Retorna a jogada do livro de aberturas para a posição, se houver uma e ela for legal."""
+        if self.book is None:
+            return None
+        book_move = self.book.get_move(fen, self.book_random)
+        if book_move is None:
+            return None
+        initial_pos, move = book_move
+        for piece, possible_moves in self.position.get_legal_moves(color):
+            if piece.square == initial_pos and move in possible_moves:
+                self.pv = [book_move]
+                return initial_pos, move, self.pv
+        return None
+
+    def close(self):
+        """Fecha o livro de aberturas e encerra os processos da busca paralela, se houver."""
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+        if self.lazy_smp is not None:
+            self.lazy_smp.close()
+            self.lazy_smp = None
+
+    def _aspiration_search(self, board, depth, root_moves):
+        """Busca a raiz com uma janela em volta da pontuação da iteração anterior, alargando-a se a pontuação cair fora."""
+        if not self.aspiration or self.completed_depth == 0:
+            return self._search_root(board, depth, root_moves, float('-inf'), float('inf'))
+        window = ASPIRATION_WINDOW
+        while True:
+            if window > ASPIRATION_MAX_WINDOW:
+                return self._search_root(board, depth, root_moves, float('-inf'), float('inf'))
+            alpha, beta = self.best_eval - window, self.best_eval + window
+            best_move, max_eval, pv = self._search_root(board, depth, root_moves, alpha, beta)
+            if alpha < max_eval < beta:
+                return best_move, max_eval, pv
+            self.aspiration_researches += 1
+            window *= ASPIRATION_GROWTH
+
+    def _search_root(self, board, depth, root_moves, alpha, beta):
+        """Busca as jogadas da raiz até a profundidade indicada dentro da janela (alpha, beta).
+
+        Retorna a melhor jogada, sua pontuação e a linha principal. A busca para na primeira jogada que
+        alcança beta; se nenhuma passar de alpha, a pontuação é só um limite superior.
+        """
         best_move = None
         max_eval = float('-inf')
-        legal_moves = board.get_legal_moves()
-        initial_positions = []
-        for piece, possible_moves in legal_moves:
-            initial_positions.append((piece, piece.square))
-        for piece, possible_moves in legal_moves:
-            for move in possible_moves:
-                board.fake_push((piece, move))
-                eval = self.minimax_alpha_beta(board, self.depth - 1, float('-inf'), float('inf'), False)
-                if eval > max_eval:
-                    max_eval = eval
-                    best_move = (piece, move)
-                   
-                board.fake_pop()
-        for piece, pos in initial_positions:
-            best_piece, move = best_move
-            if (piece == best_piece):
-                initial_pos = pos
+        self.pv_length[0] = 0
+        for move_number, root_move in enumerate(root_moves):
+            piece, initial_pos, move = root_move
+            lower = max(alpha, max_eval)
+            board.fake_push((piece, move))
+            if move_number == 0 or not self.pvs:
+                eval = self.minimax_alpha_beta(board, depth - 1, lower, beta, False, 1)
+            else:
+                eval = self.minimax_alpha_beta(board, depth - 1, lower, lower + NULL_WINDOW, False, 1)
+                if lower < eval < beta:
+                    eval = self.minimax_alpha_beta(board, depth - 1, lower, beta, False, 1)
+            board.fake_pop()
+            if best_move is None or eval > max_eval:
+                max_eval = eval
+                best_move = root_move
+                self._update_pv(0, (initial_pos, move))
+            if max_eval >= beta:
                 break
-        return initial_pos, best_move[1]
+        return best_move, max_eval, self.pv_table[0][:self.pv_length[0]]
+
+    def _probe_bitbases(self, board, color):
+        """Consulta as tabelas de finais com a cor color jogando.
+
+        Retorna (WIN, DRAW ou LOSS, distância até o mate); (None, None) fora das tabelas e distância None
+        se a tabela não tiver as distâncias.
+        """
+        if len(board.white_pieces) + len(board.black_pieces) > MAX_PIECES or not self.bitbases.tables:
+            return None, None
+        pieces = [(BITBASE_KINDS[piece.kind], piece.color, square_index(piece.square))
+                  for group in (board.white_pieces, board.black_pieces) for piece in group]
+        return self.bitbases.probe_distance(pieces, color)
+
+    def _bitbase_score(self, board, result, distance, maximizing_player, color, ply):
+        """Converte o resultado das tabelas, com color jogando, em pontuação do ponto de vista da IA.
+
+        Mate e afogamento são reconhecidos antes: o mate vale MATE_SCORE menos o ply, acima de qualquer
+        vitória das tabelas. Com as distâncias, uma vitória vale mais quanto mais perto do mate estiver,
+        contando os meio-lances desde a raiz. Sem elas as tabelas só dizem quem vence, então entre as
+        posições ganhas são preferidas as que deixam o lado perdedor com menos jogadas legais, o rei dele
+        mais perto da borda e os reis mais próximos, o que leva o vencedor a converter o final.
+        """
+        if result != WIN and not board.get_legal_moves(color):
+            if not self._in_check(board, color):
+                return 0
+            return -(MATE_SCORE - ply) if maximizing_player else MATE_SCORE - ply
+        if result == DRAW:
+            return 0
+        winner_is_max = (result == WIN) == maximizing_player
+        if distance is not None:
+            score = BITBASE_WIN + DISTANCE_WEIGHT * (MAX_DISTANCE - min(distance + ply, MAX_DISTANCE))
+            return score if winner_is_max else -score
+        winner_color = board.turn if winner_is_max else ('w' if board.turn == 'b' else 'b')
+        winner_king = board.white_king if winner_color == 'w' else board.black_king
+        loser_king = board.black_king if winner_color == 'w' else board.white_king
+        x, y = loser_king.square
+        center_distance = max(3 - x, x - 4) + max(3 - y, y - 4)
+        kings_distance = abs(x - winner_king.square[0]) + abs(y - winner_king.square[1])
+        mobility = sum(len(moves) for _, moves in board.get_legal_moves(loser_king.color))
+        progress = 4 * center_distance + 4 * (14 - kings_distance) + 4 * (8 - min(mobility, 8))
+        score = BITBASE_WIN + progress if winner_is_max else -BITBASE_WIN - progress
+        return score + self.evaluate_board(board)
+
+    def _filter_root_moves(self, board, root_moves):
+        """Mantém só as jogadas da raiz que preservam o melhor resultado garantido pelas tabelas de finais."""
+        if len(board.white_pieces) + len(board.black_pieces) > MAX_PIECES or not self.bitbases.tables:
+            return root_moves
+        opponent = 'w' if board.turn == 'b' else 'b'
+        # O resultado é do ponto de vista do adversário, que joga depois da jogada da raiz
+        outcome = {LOSS: 2, DRAW: 1, WIN: 0}
+        results = []
+        for piece, _, move in root_moves:
+            board.fake_push((piece, move))
+            results.append(self._probe_bitbases(board, opponent)[0])
+            board.fake_pop()
+        known = [outcome[result] for result in results if result is not None]
+        if not known:
+            return root_moves
+        best = max(known)
+        return [root_move for root_move, result in zip(root_moves, results)
+                if result is None or outcome[result] == best]
+
+    def _out_of_budget(self):
+        """Retorna True se o tempo, o limite de nós ou o sinal de parada da busca se esgotaram."""
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            return True
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            return True
+        return self.stop_event is not None and self.stop_event.is_set()
 
     def evaluate_board(self, board):
-        """Calcula a pontuação do tabuleiro atual com base nas posições das peças e o valor de cada uma."""
-        
-        score = 0
-        piece_table = {
-            Queen: np.array([
-                [-2.0, -1.0, -1.0, -0.5, -0.5, -1.0, -1.0, -2.0],
-                [-1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, -1.0],
-                [-1.0, 0.0, 0.5, 0.5, 0.5, 0.5, 0.0, -1.0],
-                [-0.5, 0.0, 0.5, 0.5, 0.5, 0.5, 0.0, -0.5],
-                [0.0, 0.0, 0.5, 0.5, 0.5, 0.5, 0.0, -0.5],
-                [-1.0, 0.5, 0.5, 0.5, 0.5, 0.5, 0.0, -1.0],
-                [-1.0, 0.0, 0.5, 0.0, 0.0, 0.0, 0.0, -1.0],
-                [-2.0, -1.0, -1.0, -0.5, -0.5, -1.0, -1.0, -2.0]
-            ]),
-
-            King: np.array([
-                [-3.0, -4.0, -3.0, -4.0, -5.0, -4.0, -3.0, -3.0],
-                [-3.0, -4.0, -4.0, -5.0, -5.0, -4.0, -4.0, -3.0],
-                [-3.0, -4.0, -4.0, -5.0, -5.0, -4.0, -4.0, -3.0],
-                [-3.0, -4.0, -4.0, -5.0, -5.0, -4.0, -4.0, -3.0],
-                [-2.0, -3.0, -3.0, -4.0, -4.0, -3.0, -3.0, -2.0],
-                [-1.0, -2.0, -2.0, -2.0, -2.0, -2.0, -2.0, -1.0],
-                [2.0, 2.0, 0.0, 0.0, 0.0, 0.0, 2.0, 2.0],
-                [2.0, 3.0, 1.0, 0.0, 0.0, 1.0, 3.0, 2.0]
-            ]),
-
-            Knight: np.array([
-                [-5.0, -3.5, -3.0, -3.0, -3.0, -3.0, -3.5, -5.0],
-                [-4.0, -2.0, 0.0, 0.0, 0.0, 0.0, -2.0, -4.0],
-                [-3.0, 0.0, 1.0, 1.5, 1.5, 1.0, 0.0, -3.0],
-                [-4.0, 0.5, 1.5, 2.0, 2.0, 1.5, 0.5, -3.0],
-                [-3.0, 0.0, 1.5, 2.0, 2.0, 1.5, 0.0, -3.0],
-                [-3.0, 0.5, 1.0, 1.5, 1.5, 1.0, 0.5, -3.0],
-                [-4.0, -2.0, 0.0, 0.5, 0.5, 0.0, -2.0, -4.0],
-                [-5.0, -4.0, -3.0, -3.0, -3.0, -3.0, -4.0, -5.0]
-            ]),
-
-            Rook: np.array([
-                [0.0, 0.0, 0.0, 0.0, 0.0, 2.0, 0.0, 0.0],
-                [0.5, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 0.5],
-                [-0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, -0.5],
-                [-0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, -0.5],
-                [-0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, -0.5],
-                [-0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, -0.5],
-                [-0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, -0.5],
-                [0.0, -1.0, 0.0, 0.5, 0.5, 0.0, -1.0, 0.0]
-            ]),
-
-            Pawn: np.array([
-                [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
-                [2.0, 2.0, 2.0, 2.0, 2.0, 2.0, 2.0, 2.0],
-                [1.0, 1.0, 2.0, 4.0, 4.0, 2.0, 1.0, 4.0],
-                [0.5, 0.5, 1.0, 4.0, 4.0, 1.0, 0.5, 0.5],
-                [0.0, 0.0, 0.0, 2.0, 2.0, 0.0, 0.0, 0.0],
-                [0.5, -0.5, -1.0, 0.0, 0.0, -1.0, -0.5, 0.5],
-                [0.5, 1.0, 1.0, -2.0, -2.0, 1.0, 1.0, 0.5],
-                [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
-            ]),
-
-            Bishop: np.array([
-                [-2.0, -1.0, -1.0, -1.0, -1.0, -1.0, -1.0, -2.0],
-                [-1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, -1.0],
-                [-1.0, 0.0, 0.5, 1.0, 1.0, 0.5, 0.0, -1.0],
-                [-1.0, 0.5, 0.5, 1.0, 1.0, 0.5, 0.5, -1.0],
-                [-1.0, 0.0, 1.0, 1.0, 1.0, 1.0, 0.0, -1.0],
-                [-1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, -1.0],
-                [-1.0, 0.5, 0.0, 0.0, 0.0, 0.0, 0.5, -1.0],
-                [-2.0, -1.0, -1.0, -1.0, -1.0, -1.0, -1.0, -2.0]
-            ])
-            
-        }
-        all_pieces = board.black_pieces.sprites() + board.white_pieces.sprites()
-        player1 = board.turn
-        if player1 == 'b':
-            for piece in all_pieces:
-                score += piece_table[type(piece)][piece.square[1], piece.square[0]]
-                if piece.color == 'w':
-                    score += self.piece_values[type(piece)] * -1
-                else:
-                    score += self.piece_values[type(piece)]
-        else:
-            for piece in all_pieces:
-                score += (piece_table[type(piece)])[piece.square[1], piece.square[0]]
-                if piece.color == 'b':
-                    score += self.piece_values[type(piece)] * -1
-                else:
-                    score += self.piece_values[type(piece)]
-        return score
\ No newline at end of file
+        """Retorna a pontuação do tabuleiro do ponto de vista do jogador da vez: valor das peças mais tabela de posições.
+
+        Os termos são mantidos pelo tabuleiro em fake_push/fake_pop, então a avaliação é só uma consulta; com
+        check_evaluation ela é conferida com o cálculo completo a cada chamada.
+        """
+        opponent = 'w' if board.turn == 'b' else 'b'
+        score = board.piece_square_score + board.material[board.turn] - board.material[opponent]
+        if self.check_evaluation:
+            full_score = self.full_evaluation(board)
+            if score != full_score:
+                raise AssertionError(f"Incremental evaluation {score} differs from full evaluation {full_score}")
+        return score
+
+    def full_evaluation(self, board):
+        """Calcula a pontuação do tabuleiro do zero, percorrendo todas as peças."""
+        piece_square, white_material, black_material = compute_score(board.white_pieces, board.black_pieces)
+        if board.turn == 'w':
+            return piece_square + white_material - black_material
+        return piece_square + black_material - white_material
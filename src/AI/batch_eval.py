@@ -0,0 +1,74 @@
+import numpy as np
+
+from Board.evaluation import MATERIAL, PIECE_SQUARE
+from Board.zobrist import PIECE_NAMES, square_index
+
+# Índice de cada peça no vetor da posição; 0 é a casa vazia
+PIECE_INDEX = {name: i + 1 for i, name in enumerate(PIECE_NAMES)}
+_SQUARES = np.arange(64)
+
+
+def _score_table(turn):
+    """Monta a tabela (peça, casa) -> valor da peça com sinal mais tabela de posições, do ponto de vista de turn."""
+    table = np.zeros((len(PIECE_NAMES) + 1, 64))
+    for name, index in PIECE_INDEX.items():
+        sign = 1 if name[0] == turn else -1
+        table[index] = np.array(PIECE_SQUARE[name]) + sign * MATERIAL[name]
+    return table
+
+
+SCORE_TABLES = {'w': _score_table('w'), 'b': _score_table('b')}
+
+
+def encode(board):
+    """Retorna o vetor com o índice da peça (0 se vazia) de cada uma das 64 casas do tabuleiro."""
+    position = np.zeros(64, dtype=np.intp)
+    for group in (board.white_pieces, board.black_pieces):
+        for piece in group:
+            position[square_index(piece.square)] = PIECE_INDEX[piece.name]
+    return position
+
+
+def evaluate_positions(positions, turn):
+    """Avalia de uma vez as posições (matriz n x 64 de índices de peça) do ponto de vista de turn.
+
+    É a mesma pontuação de Ai.evaluate_board, calculada com uma única consulta vetorizada às tabelas.
+    """
+    return SCORE_TABLES[turn][positions, _SQUARES].sum(axis=1)
+
+
+def evaluate_children(board, moves):
+    """Avalia todas as posições filhas do tabuleiro, uma por jogada (peça, casa), sem executar as jogadas.
+
+    As filhas são montadas a partir da posição atual movendo a peça de cada jogada (a peça capturada é
+    sobrescrita) e avaliadas do ponto de vista de board.turn, como na busca. As regras especiais de
+    fake_push também são aplicadas: a promoção a dama, a torre do roque e o peão capturado en passant.
+    """
+    position = encode(board)
+    count = len(moves)
+    origins = np.fromiter((square_index(piece.square) for piece, _ in moves), dtype=np.intp, count=count)
+    targets = np.fromiter((square_index(move) for _, move in moves), dtype=np.intp, count=count)
+    rows = np.arange(count)
+    children = np.repeat(position[np.newaxis, :], count, axis=0)
+    children[rows, targets] = position[origins]
+    children[rows, origins] = 0
+
+    # As jogadas especiais são raras, então as casas que elas mudam são juntadas uma a uma
+    changes = []
+    for row, (piece, move) in enumerate(moves):
+        kind = piece.name[1:]
+        column, rank = piece.square
+        if kind == "Pawn" and move[1] in (0, 7):
+            changes.append((row, square_index(move), PIECE_INDEX[f"{piece.color}Queen"]))
+        elif kind == "Pawn" and move[0] != column and board.square[move] is None:
+            changes.append((row, square_index((move[0], rank)), 0))
+        elif kind == "King" and abs(move[0] - column) == 2:
+            short = move[0] > column
+            rook_square = square_index((column + (3 if short else -4), rank))
+            if position[rook_square]:
+                changes.append((row, rook_square, 0))
+                changes.append((row, square_index((column + (1 if short else -1), rank)), position[rook_square]))
+    if changes:
+        change_rows, change_squares, change_values = zip(*changes)
+        children[list(change_rows), list(change_squares)] = change_values
+    return evaluate_positions(children, board.turn)
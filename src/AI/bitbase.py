@@ -0,0 +1,492 @@
+import argparse
+import os
+from collections import defaultdict
+
+# Resultados do ponto de vista do jogador da vez
+DRAW = 0
+WIN = 1
+LOSS = 2
+INVALID = 3
+UNKNOWN = 4
+
+WHITE, BLACK = 'w', 'b'
+PIECE_STRENGTH = {'Q': 9, 'R': 5, 'B': 3, 'N': 3, 'P': 1}
+MAX_PIECES = 4
+# As distâncias até o mate são guardadas em um byte por posição
+MAX_DISTANCE = 255
+
+# As casas são numeradas como no tabuleiro: coluna + 8 * linha, com a linha 0 sendo a das peças pretas
+_KING_STEPS = [(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)]
+_KNIGHT_STEPS = [(2, 1), (2, -1), (1, 2), (-1, 2), (-2, 1), (-2, -1), (-1, -2), (1, -2)]
+_ROOK_DIRECTIONS = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+_BISHOP_DIRECTIONS = [(1, 1), (-1, 1), (-1, -1), (1, -1)]
+
+
+def _step_targets(steps):
+    """Retorna, para cada casa, a lista de casas alcançadas com um passo de steps."""
+    targets = []
+    for square in range(64):
+        x, y = square % 8, square // 8
+        targets.append([(x + dx) + 8 * (y + dy) for dx, dy in steps if 0 <= x + dx < 8 and 0 <= y + dy < 8])
+    return targets
+
+
+def _rays(directions):
+    """Retorna, para cada casa, a lista de raios (casas em ordem a partir dela) em cada direção."""
+    rays = []
+    for square in range(64):
+        x, y = square % 8, square // 8
+        square_rays = []
+        for dx, dy in directions:
+            ray = []
+            nx, ny = x + dx, y + dy
+            while 0 <= nx < 8 and 0 <= ny < 8:
+                ray.append(nx + 8 * ny)
+                nx, ny = nx + dx, ny + dy
+            square_rays.append(ray)
+        rays.append(square_rays)
+    return rays
+
+
+KING_TARGETS = _step_targets(_KING_STEPS)
+KNIGHT_TARGETS = _step_targets(_KNIGHT_STEPS)
+ROOK_RAYS = _rays(_ROOK_DIRECTIONS)
+BISHOP_RAYS = _rays(_BISHOP_DIRECTIONS)
+# Casas atacadas por um peão de cada cor (o peão branco anda para a linha 0)
+PAWN_ATTACKS = {
+    WHITE: _step_targets([(-1, -1), (1, -1)]),
+    BLACK: _step_targets([(-1, 1), (1, 1)]),
+}
+PAWN_DIRECTION = {WHITE: -8, BLACK: 8}
+PAWN_START_ROW = {WHITE: 6, BLACK: 1}
+PAWN_PROMOTION_ROW = {WHITE: 0, BLACK: 7}
+
+# Casas entre duas casas alinhadas e o tipo de linha ('R' para fileira/coluna, 'B' para diagonal)
+BETWEEN = [[None] * 64 for _ in range(64)]
+for _square in range(64):
+    for _line, _all_rays in (('R', ROOK_RAYS), ('B', BISHOP_RAYS)):
+        for _ray in _all_rays[_square]:
+            for _i, _target in enumerate(_ray):
+                BETWEEN[_square][_target] = (_line, _ray[:_i])
+
+
+def _other(color):
+    return BLACK if color == WHITE else WHITE
+
+
+def _attacks(kind, color, origin, target, occupied):
+    """Retorna True se a peça kind da cor color na casa origin ataca a casa target."""
+    if kind == 'K':
+        return target in KING_TARGETS[origin]
+    if kind == 'N':
+        return target in KNIGHT_TARGETS[origin]
+    if kind == 'P':
+        return target in PAWN_ATTACKS[color][origin]
+    between = BETWEEN[origin][target]
+    if between is None or (kind == 'R' and between[0] != 'R') or (kind == 'B' and between[0] != 'B'):
+        return False
+    for square in between[1]:
+        if square in occupied:
+            return False
+    return True
+
+
+def _pseudo_moves(kind, color, origin, occupied):
+    """Gera as casas de destino da peça sem considerar xeque (capturas de peão só em casas ocupadas)."""
+    if kind == 'K':
+        return KING_TARGETS[origin]
+    if kind == 'N':
+        return KNIGHT_TARGETS[origin]
+    if kind == 'P':
+        targets = []
+        step = PAWN_DIRECTION[color]
+        if origin + step not in occupied:
+            targets.append(origin + step)
+            if origin // 8 == PAWN_START_ROW[color] and origin + 2 * step not in occupied:
+                targets.append(origin + 2 * step)
+        targets.extend(square for square in PAWN_ATTACKS[color][origin] if square in occupied)
+        return targets
+    rays = ROOK_RAYS[origin] if kind == 'R' else BISHOP_RAYS[origin]
+    if kind == 'Q':
+        rays = ROOK_RAYS[origin] + BISHOP_RAYS[origin]
+    targets = []
+    for ray in rays:
+        for square in ray:
+            targets.append(square)
+            if square in occupied:
+                break
+    return targets
+
+
+def _side_signature(kinds):
+    """Retorna a assinatura de um lado ("K" seguido das outras peças da mais para a menos forte)."""
+    return 'K' + ''.join(sorted(kinds, key=lambda kind: (-PIECE_STRENGTH[kind], kind)))
+
+
+def _strength(kinds):
+    return sorted((PIECE_STRENGTH[kind] for kind in kinds), reverse=True)
+
+
+def canonical(pieces, turn):
+    """Coloca a posição na forma das tabelas: o lado com mais material é sempre o branco.
+
+    pieces é uma lista de (tipo, cor, casa). Retorna (assinatura, peças, vez); se o material das pretas
+    for maior, as cores são trocadas e o tabuleiro é espelhado verticalmente.
+    """
+    white = [kind for kind, color, _ in pieces if color == WHITE and kind != 'K']
+    black = [kind for kind, color, _ in pieces if color == BLACK and kind != 'K']
+    if (_strength(black), _side_signature(black)) > (_strength(white), _side_signature(white)):
+        pieces = [(kind, _other(color), square ^ 56) for kind, color, square in pieces]
+        turn = _other(turn)
+        white, black = black, white
+    return _side_signature(white) + _side_signature(black), pieces, turn
+
+
+class BitbaseTable:
+    """Tabela de vitória/empate/derrota de uma configuração de material, com 2 bits por posição.
+
+    distances guarda, em um byte por posição, quantos lances (meios-lances) faltam para o mate nas
+    posições ganhas e perdidas com o melhor jogo dos dois lados; tabelas antigas podem não ter.
+    """
+
+    def __init__(self, signature, data=None, distances=None):
+        """Cria a tabela da assinatura (por exemplo "KQK" ou "KRKP"); data são os bytes já compactados."""
+        self.signature = signature
+        split = signature.index('K', 1)
+        self.kinds = list(signature[:split]) + list(signature[split:])
+        self.colors = [WHITE] * split + [BLACK] * (len(signature) - split)
+        self.size = 2 * 64 ** len(self.kinds)
+        self.data = data
+        self.distances = distances
+
+    def index(self, squares, turn):
+        """Retorna o índice da posição com as peças nas casas squares (na ordem da assinatura)."""
+        index = 0 if turn == WHITE else 1
+        for square in squares:
+            index = index * 64 + square
+        return index
+
+    def squares_of(self, index):
+        """Retorna (casas das peças, vez) do índice."""
+        squares = []
+        for _ in self.kinds:
+            index, square = divmod(index, 64)
+            squares.append(square)
+        squares.reverse()
+        return squares, (WHITE if index == 0 else BLACK)
+
+    def probe_pieces(self, pieces, turn):
+        """Retorna o resultado da posição canônica (lista de (tipo, cor, casa)) para o jogador da vez."""
+        return self.value(self.position_index(pieces, turn))
+
+    def probe_distance(self, pieces, turn):
+        """Retorna (resultado, distância até o mate ou None se a tabela não tiver distâncias) da posição canônica."""
+        index = self.position_index(pieces, turn)
+        return self.value(index), None if self.distances is None else self.distances[index]
+
+    def value(self, index):
+        return (self.data[index >> 2] >> ((index & 3) << 1)) & 3
+
+    def position_index(self, pieces, turn):
+        """Retorna o índice da posição canônica (lista de (tipo, cor, casa))."""
+        remaining = list(pieces)
+        squares = []
+        for kind, color in zip(self.kinds, self.colors):
+            for i, (piece_kind, piece_color, square) in enumerate(remaining):
+                if piece_kind == kind and piece_color == color:
+                    squares.append(square)
+                    del remaining[i]
+                    break
+        return self.index(squares, turn)
+
+    def save(self, path):
+        """Grava os bytes compactados da tabela e, ao lado, as distâncias em <assinatura>.dtm."""
+        with open(path, "wb") as file:
+            file.write(self.data)
+        if self.distances is not None:
+            with open(os.path.splitext(path)[0] + ".dtm", "wb") as file:
+                file.write(self.distances)
+
+
+def _pack(values):
+    """Compacta os resultados (0 a 3) em 2 bits por posição."""
+    data = bytearray((len(values) + 3) // 4)
+    for index, value in enumerate(values):
+        if value:
+            data[index >> 2] |= (value & 3) << ((index & 3) << 1)
+    return bytes(data)
+
+
+class BitbaseGenerator:
+    """Gera tabelas por análise retrógrada, começando pelos mates e voltando lance a lance.
+
+    As posições são resolvidas em ordem de distância até o mate, então cada uma recebe a distância do
+    melhor jogo: o lado que vence mata o mais rápido possível e o que perde demora o máximo.
+    """
+
+    def __init__(self, tables=None, verbose=False):
+        """tables é um dicionário assinatura -> BitbaseTable já geradas, usado para capturas e promoções."""
+        self.tables = tables if tables is not None else {}
+        self.verbose = verbose
+
+    def probe(self, pieces, turn):
+        """(Resultado, distância até o mate) de uma posição fora da tabela em geração (após captura ou promoção)."""
+        if all(kind == 'K' for kind, _, _ in pieces):
+            return DRAW, 0
+        signature, pieces, turn = canonical(pieces, turn)
+        if signature not in self.tables:
+            self.generate(signature)
+        return self.tables[signature].probe_distance(pieces, turn)
+
+    def _dependencies(self, table):
+        """Gera antes as tabelas alcançadas por capturas e promoções."""
+        for i, kind in enumerate(table.kinds):
+            if kind == 'K':
+                continue
+            pieces = [(k, c, 0) for j, (k, c) in enumerate(zip(table.kinds, table.colors)) if j != i]
+            if any(k != 'K' for k, _, _ in pieces):
+                signature = canonical(pieces, WHITE)[0]
+                if signature not in self.tables:
+                    self.generate(signature)
+            if kind == 'P':
+                pieces = [(('Q' if j == i else k), c, 0) for j, (k, c) in enumerate(zip(table.kinds, table.colors))]
+                signature = canonical(pieces, WHITE)[0]
+                if signature not in self.tables:
+                    self.generate(signature)
+
+    def generate(self, signature):
+        """Gera a tabela da assinatura (e as que ela depende) e a guarda em self.tables."""
+        table = BitbaseTable(signature)
+        if len(table.kinds) > MAX_PIECES:
+            raise ValueError(f"{signature}: only endings with up to {MAX_PIECES} pieces are supported")
+        self._dependencies(table)
+        if self.verbose:
+            print(f"Generating {signature} ({table.size} positions)")
+
+        kinds, colors = table.kinds, table.colors
+        values = bytearray([UNKNOWN]) * table.size
+        counts = bytearray(table.size)
+        distances = bytearray(table.size)
+        # Distância mínima de uma derrota, vinda das saídas da tabela que ela tem
+        floors = bytearray(table.size)
+        # Posições candidatas a vitória ou derrota, agrupadas pela distância até o mate
+        pending = defaultdict(list)
+
+        for index in range(table.size):
+            squares, turn = table.squares_of(index)
+            value, count, distance = self._initial_value(kinds, colors, squares, turn)
+            if value in (WIN, LOSS):
+                pending[distance].append((index, value))
+            elif value == UNKNOWN:
+                counts[index] = count
+                floors[index] = distance
+            else:
+                values[index] = value
+
+        # Cada posição é resolvida na menor distância em que aparece; as candidatas seguintes são ignoradas
+        distance = 0
+        while pending:
+            for index, value in pending.pop(distance, ()):
+                if values[index] != UNKNOWN:
+                    continue
+                values[index] = value
+                distances[index] = distance
+                squares, turn = table.squares_of(index)
+                for previous in self._previous_positions(table, squares, turn):
+                    if values[previous] != UNKNOWN:
+                        continue
+                    if value == LOSS:
+                        pending[min(distance + 1, MAX_DISTANCE)].append((previous, WIN))
+                    elif counts[previous]:
+                        # Posições com uma saída que não perde têm contador zero e nunca viram derrota
+                        counts[previous] -= 1
+                        if counts[previous] == 0:
+                            pending[min(max(distance + 1, floors[previous]), MAX_DISTANCE)].append((previous, LOSS))
+            distance += 1
+
+        for index in range(table.size):
+            if values[index] == UNKNOWN:
+                values[index] = DRAW
+        table.data = _pack(values)
+        table.distances = bytes(distances)
+        self.tables[signature] = table
+        return table
+
+    def _initial_value(self, kinds, colors, squares, turn):
+        """Classifica a posição antes da análise retrógrada.
+
+        Retorna (resultado, jogadas que continuam na tabela, distância). O resultado é INVALID para posições
+        impossíveis, WIN se alguma captura ou promoção leva a uma posição perdida para o adversário,
+        LOSS ou DRAW para mate e afogamento e UNKNOWN nos demais casos. Uma posição com alguma saída da
+        tabela que não perde nunca pode ser perdida, então o contador dela é zerado. A distância é a da
+        melhor saída ganha para WIN e a da saída que mais demora para LOSS e UNKNOWN (vitória ou derrota
+        pela tabela não podem ser mais rápidas que ela).
+        """
+        occupied = set(squares)
+        if len(occupied) != len(squares):
+            return INVALID, 0, 0
+        for kind, square in zip(kinds, squares):
+            if kind == 'P' and square // 8 in (0, 7):
+                return INVALID, 0, 0
+        # The side that just moved cannot be in check
+        if self._in_check(kinds, colors, squares, _other(turn), occupied):
+            return INVALID, 0, 0
+
+        count = 0
+        escape = False
+        has_moves = False
+        win_distance = None
+        loss_distance = 0
+        for i, (kind, color) in enumerate(zip(kinds, colors)):
+            if color != turn:
+                continue
+            origin = squares[i]
+            for target in _pseudo_moves(kind, color, origin, occupied):
+                captured = None
+                if target in occupied:
+                    captured = squares.index(target)
+                    if colors[captured] == turn or kinds[captured] == 'K':
+                        continue
+                new_squares = list(squares)
+                new_squares[i] = target
+                new_kinds = list(kinds)
+                if kind == 'P' and target // 8 == PAWN_PROMOTION_ROW[color]:
+                    new_kinds[i] = 'Q'
+                pieces = [(k, c, s) for j, (k, c, s) in enumerate(zip(new_kinds, colors, new_squares))
+                          if j != captured]
+                new_occupied = set(s for _, _, s in pieces)
+                if self._in_check([k for k, _, _ in pieces], [c for _, c, _ in pieces],
+                                  [s for _, _, s in pieces], turn, new_occupied):
+                    continue
+                has_moves = True
+                if captured is None and new_kinds[i] == kind:
+                    count += 1
+                    continue
+                result, distance = self.probe(pieces, _other(turn))
+                distance = min(distance + 1, MAX_DISTANCE)
+                if result == LOSS:
+                    win_distance = distance if win_distance is None else min(win_distance, distance)
+                elif result == WIN:
+                    loss_distance = max(loss_distance, distance)
+                else:
+                    escape = True
+        if not has_moves:
+            return (LOSS if self._in_check(kinds, colors, squares, turn, occupied) else DRAW), 0, 0
+        if win_distance is not None:
+            return WIN, 0, win_distance
+        if escape:
+            return UNKNOWN, 0, 0
+        if count == 0:
+            return LOSS, 0, loss_distance
+        return UNKNOWN, count, loss_distance
+
+    def _in_check(self, kinds, colors, squares, color, occupied):
+        """Retorna True se o rei da cor color está atacado."""
+        king = None
+        for kind, piece_color, square in zip(kinds, colors, squares):
+            if kind == 'K' and piece_color == color:
+                king = square
+                break
+        for kind, piece_color, square in zip(kinds, colors, squares):
+            if piece_color != color and _attacks(kind, piece_color, square, king, occupied):
+                return True
+        return False
+
+    def _previous_positions(self, table, squares, turn):
+        """Gera os índices das posições de onde o lado que acabou de jogar chega a esta com uma jogada
+        sem captura e sem promoção."""
+        mover = _other(turn)
+        occupied = set(squares)
+        for i, (kind, color) in enumerate(zip(table.kinds, table.colors)):
+            if color != mover:
+                continue
+            target = squares[i]
+            if kind == 'P':
+                step = PAWN_DIRECTION[color]
+                origins = []
+                origin = target - step
+                if 0 < origin // 8 < 7 and origin not in occupied:
+                    origins.append(origin)
+                    start = target - 2 * step
+                    if target // 8 == PAWN_START_ROW[color] + 2 * step // 8 and start not in occupied:
+                        origins.append(start)
+            else:
+                origins = [square for square in _pseudo_moves(kind, color, target, occupied)
+                           if square not in occupied]
+            for origin in origins:
+                previous = list(squares)
+                previous[i] = origin
+                yield table.index(previous, mover)
+
+
+class Bitbases:
+    """Consulta as tabelas gravadas em um diretório (um arquivo <assinatura>.bb por tabela)."""
+
+    def __init__(self, directory):
+        """Carrega as tabelas encontradas no diretório (se ele existir)."""
+        self.tables = {}
+        self.probes = 0
+        self.hits = 0
+        if directory is None or not os.path.isdir(directory):
+            return
+        for file_name in os.listdir(directory):
+            signature, extension = os.path.splitext(file_name)
+            if extension == ".bb":
+                with open(os.path.join(directory, file_name), "rb") as file:
+                    data = file.read()
+                distances = None
+                distance_path = os.path.join(directory, signature + ".dtm")
+                if os.path.exists(distance_path):
+                    with open(distance_path, "rb") as file:
+                        distances = file.read()
+                self.tables[signature] = BitbaseTable(signature, data, distances)
+
+    def probe(self, pieces, turn):
+        """Retorna WIN, DRAW ou LOSS para o jogador da vez, ou None se a posição não estiver nas tabelas.
+
+        pieces é uma lista de (tipo, cor, casa) com tipo em "KQRBNP" e casa = coluna + 8 * linha.
+        """
+        return self.probe_distance(pieces, turn)[0]
+
+    def probe_distance(self, pieces, turn):
+        """Retorna (resultado, distância até o mate), como probe; a distância é None se a tabela não a tiver."""
+        if len(pieces) > MAX_PIECES or not self.tables:
+            return None, None
+        # Na busca o rei pode ter sido capturado; essas posições não estão nas tabelas
+        if sorted(color for kind, color, _ in pieces if kind == 'K') != [BLACK, WHITE]:
+            return None, None
+        self.probes += 1
+        if all(kind == 'K' for kind, _, _ in pieces):
+            self.hits += 1
+            return DRAW, 0
+        signature, pieces, turn = canonical(pieces, turn)
+        table = self.tables.get(signature)
+        if table is None:
+            return None, None
+        result, distance = table.probe_distance(pieces, turn)
+        if result == INVALID:
+            return None, None
+        self.hits += 1
+        return result, distance
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera tabelas de finais (vitória/empate/derrota) por análise retrógrada.")
+    parser.add_argument("directory", help="diretório onde as tabelas são gravadas")
+    parser.add_argument("signatures", nargs="+", help="finais a gerar, como KQK KRK KPK KQKR")
+    args = parser.parse_args()
+    os.makedirs(args.directory, exist_ok=True)
+    generator = BitbaseGenerator(verbose=True)
+    for signature in args.signatures:
+        split = signature.index('K', 1)
+        pieces = [(kind, WHITE if i < split else BLACK, 0) for i, kind in enumerate(signature)]
+        signature = canonical(pieces, WHITE)[0]
+        if signature not in generator.tables:
+            generator.generate(signature)
+    for signature, table in generator.tables.items():
+        table.save(os.path.join(args.directory, signature + ".bb"))
+        print(f"{signature}.bb and {signature}.dtm saved")
+
+
+if __name__ == "__main__":
+    main()
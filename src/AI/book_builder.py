@@ -0,0 +1,139 @@
+import argparse
+import re
+from collections import defaultdict
+
+from Board.board import Board
+from Game.headless import HeadlessGame
+from piece.pawn import Pawn
+from piece.king import King
+from piece.bishop import Bishop
+from piece.knight import Knight
+from piece.queen import Queen
+from piece.rook import Rook
+from .opening_book import ENTRY, polyglot_key, encode_move
+
+SAN_MOVE = re.compile(r"^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$")
+RESULTS = {"1-0": 'w', "0-1": 'b', "1/2-1/2": None, "*": None}
+PIECE_LETTERS = {'N': Knight, 'B': Bishop, 'R': Rook, 'Q': Queen, 'K': King, None: Pawn}
+PIECE_SYMBOLS = {Pawn: 'p', Knight: 'n', Bishop: 'b', Rook: 'r', Queen: 'q', King: 'k'}
+MAX_WEIGHT = 0xFFFF
+
+
+def movetext_tokens(movetext):
+    """Retorna os lances SAN do texto de uma partida, sem comentários, variantes, NAGs e números."""
+    movetext = re.sub(r"\{[^}]*\}|;[^\n]*", " ", movetext)
+    # As variantes podem ser aninhadas: remove as mais internas até não sobrar nenhuma
+    while True:
+        stripped = re.sub(r"\([^()]*\)", " ", movetext)
+        if stripped == movetext:
+            break
+        movetext = stripped
+    tokens = []
+    for token in movetext.split():
+        token = re.sub(r"^\d+\.+", "", token)
+        if token and not token.startswith('$') and token not in RESULTS:
+            tokens.append(token)
+    return tokens
+
+
+def read_games(path):
+    """Lê um arquivo PGN linha a linha e gera (cor vencedora ou None, lista de lances SAN) de cada partida."""
+    result = None
+    movetext = []
+    with open(path, encoding="utf-8", errors="replace") as pgn:
+        for line in pgn:
+            line = line.strip()
+            if line.startswith('['):
+                if movetext:
+                    yield result, movetext_tokens(" ".join(movetext))
+                    movetext = []
+                if line.startswith("[Result "):
+                    result = RESULTS.get(line.split('"')[1])
+            elif line:
+                movetext.append(line)
+    if movetext:
+        yield result, movetext_tokens(" ".join(movetext))
+
+
+def find_move(board, san):
+    """Retorna a jogada legal (peça, casa) correspondente ao lance SAN ou None se não houver uma."""
+    san = san.rstrip("+#!?")
+    legal_moves = board.get_legal_moves()
+    if san in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        king = board.white_king if board.turn == 'w' else board.black_king
+        target = (6 if len(san) == 3 else 2, king.square[1])
+        for piece, possible_moves in legal_moves:
+            if piece is king and target in possible_moves and king.square[0] == 4:
+                return piece, target
+        return None
+    match = SAN_MOVE.match(san)
+    # O jogo só promove a dama
+    if match is None or match.group(5) not in (None, 'Q'):
+        return None
+    letter, from_file, from_rank, target, _ = match.groups()
+    target = board.pos_to_movement(target)
+    candidates = []
+    for piece, possible_moves in legal_moves:
+        if type(piece) is not PIECE_LETTERS[letter] or target not in possible_moves:
+            continue
+        if from_file and piece.square[0] != ord(from_file) - ord('a'):
+            continue
+        if from_rank and piece.square[1] != 8 - int(from_rank):
+            continue
+        candidates.append((piece, target))
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def build_book(pgn_paths, output_path, max_plies=20, min_games=1):
+    """Cria um livro Polyglot com as jogadas dos primeiros max_plies lances das partidas dos PGNs.
+
+    O peso de cada jogada é 2 por vitória e 1 por empate de quem a jogou; jogadas vistas em menos de
+    min_games partidas ou que nunca pontuaram ficam de fora. Retorna o número de entradas gravadas.
+    """
+    weights = defaultdict(int)
+    games = defaultdict(int)
+    for path in pgn_paths:
+        for winner, moves in read_games(path):
+            board = Board(HeadlessGame())
+            board._reset_all()
+            for san in moves[:max_plies]:
+                move = find_move(board, san)
+                if move is None:
+                    break
+                piece, square = move
+                entry = (polyglot_key(board._get_FEN_position()),
+                         encode_move(piece.square, square, PIECE_SYMBOLS[type(piece)]))
+                games[entry] += 1
+                if winner is None:
+                    weights[entry] += 1
+                elif winner == board.turn:
+                    weights[entry] += 2
+                board.make_move(piece, square)
+                if board.turn == 'w':
+                    board.total_turns += 1
+                board.turn = 'b' if board.turn == 'w' else 'w'
+
+    entries = [(key, move, weight) for (key, move), weight in weights.items()
+               if weight and games[(key, move)] >= min_games]
+    scale = max((weight for _, _, weight in entries), default=0)
+    scale = MAX_WEIGHT / scale if scale > MAX_WEIGHT else 1
+    entries.sort(key=lambda entry: (entry[0], -entry[2]))
+    with open(output_path, "wb") as book:
+        for key, move, weight in entries:
+            book.write(ENTRY.pack(key, move, max(1, int(weight * scale)), 0))
+    return len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cria um livro de aberturas Polyglot a partir de arquivos PGN.")
+    parser.add_argument("output", help="arquivo .bin do livro")
+    parser.add_argument("pgn", nargs="+", help="arquivos PGN com as partidas")
+    parser.add_argument("--plies", type=int, default=20, help="número de lances de cada partida (padrão 20)")
+    parser.add_argument("--min-games", type=int, default=1, help="partidas mínimas por jogada (padrão 1)")
+    args = parser.parse_args()
+    entries = build_book(args.pgn, args.output, args.plies, args.min_games)
+    print(f"{entries} entradas gravadas em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import multiprocessing
+import time
+from multiprocessing.shared_memory import SharedMemory
+
+from .transposition import TranspositionTable, table_bytes
+
+# Estado de cada processo auxiliar, criado por _init_worker
+_worker_ai = None
+_worker_stop = None
+_worker_shared_memory = None
+
+
+def _init_worker(shm_name, tt_size_mb, depth, options, stop):
+    """Inicializa um processo auxiliar: conecta à tabela compartilhada e cria a IA dele."""
+    global _worker_ai, _worker_stop, _worker_shared_memory
+    from Game.headless import HeadlessGame
+    from .ai import Ai
+
+    _worker_shared_memory = SharedMemory(name=shm_name)
+    tt = TranspositionTable(tt_size_mb, buffer=_worker_shared_memory.buf)
+    _worker_ai = Ai(HeadlessGame(), depth, transposition_table=tt, **options)
+    _worker_stop = stop
+
+
+def _search(worker_id, fen, color, time_limit, node_limit, history):
+    """Busca a posição em um processo auxiliar e retorna (profundidade completa, pontuação, jogada, nós).
+
+    O processo 0 busca até a profundidade da IA; os demais começam um nível acima (profundidades
+    alternadas) e seguem aprofundando até receberem o sinal de parada.
+    """
+    from .ai import MAX_SEARCH_DEPTH
+
+    ai = _worker_ai
+    # A tabela compartilhada é limpa pelo processo principal quando a cor da IA muda
+    ai.tt_color = color
+    has_budget = time_limit is not None or node_limit is not None
+    max_depth = ai.depth if worker_id == 0 and not has_budget else MAX_SEARCH_DEPTH
+    move = ai.get_best_move(fen, color, time_limit, node_limit, _worker_stop,
+                            start_depth=1 + worker_id % 2, max_depth=max_depth, history=history)
+    return ai.completed_depth, ai.best_eval, move, ai.nodes
+
+
+class LazySMP:
+    """Busca paralela Lazy SMP: vários processos buscam a mesma raiz compartilhando a tabela de transposição."""
+
+    def __init__(self, threads, depth, tt_size_mb=16, options=None):
+        """Cria a tabela de transposição em memória compartilhada; os processos são iniciados na primeira busca."""
+        self.threads = threads
+        self.depth = depth
+        self.tt_size_mb = tt_size_mb
+        self.options = options or {}
+        self.shared_memory = SharedMemory(create=True, size=table_bytes(tt_size_mb))
+        self.tt = TranspositionTable(tt_size_mb, buffer=self.shared_memory.buf)
+        self.tt_color = None
+        self.stop = multiprocessing.Event()
+        self.pool = None
+        self.results = []
+        self.nodes = 0
+        self.completed_depth = 0
+        self.best_eval = 0
+
+    def _start(self):
+        """Inicia os processos auxiliares."""
+        self.pool = multiprocessing.Pool(
+            self.threads, initializer=_init_worker,
+            initargs=(self.shared_memory.name, self.tt_size_mb, self.depth, self.options, self.stop))
+
+    def get_best_move(self, fen, color, time_limit=None, node_limit=None, stop_event=None, history=()):
+        """Busca em paralelo e retorna a jogada do processo que completou a maior profundidade.
+
+        A busca termina quando o processo 0 alcança a profundidade da IA ou quando o orçamento de tempo,
+        de nós ou o stop_event deste processo se esgotam; então os demais processos recebem o sinal de parada.
+        """
+        if self.pool is None:
+            self._start()
+        if color != self.tt_color:
+            self.tt.clear()
+            self.tt_color = color
+        self.stop.clear()
+        history = list(history)
+        tasks = [self.pool.apply_async(_search, (worker_id, fen, color, time_limit, node_limit, history))
+                 for worker_id in range(self.threads)]
+        while not tasks[0].ready():
+            if stop_event is not None and stop_event.is_set():
+                self.stop.set()
+            time.sleep(0.001)
+        self.stop.set()
+        self.results = [task.get() for task in tasks]
+        self.nodes = sum(result[3] for result in self.results)
+        # O primeiro resultado com a maior profundidade completa vence, preferindo o processo 0
+        self.completed_depth, self.best_eval, move, _ = max(self.results, key=lambda result: result[0])
+        return move
+
+    def close(self):
+        """Encerra os processos e remove a memória compartilhada."""
+        if self.pool is not None:
+            self.stop.set()
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        self.tt.release()
+        self.shared_memory.close()
+        self.shared_memory.unlink()
@@ -0,0 +1,88 @@
+from Board.zobrist import square_index
+
+# Faixas de prioridade: jogada da tabela > capturas > killers > histórico das jogadas quietas
+HASH_MOVE_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 20
+KILLER_SCORE = 1 << 19
+MAX_PLY = 128
+
+
+class MoveOrderer:
+    """Ordena as jogadas geradas pelo tabuleiro antes da busca para aumentar os cortes da poda alpha-beta."""
+
+    def __init__(self, piece_values, enabled=True):
+        """Inicializa as tabelas de killers e de histórico; piece_values é a tabela de valores da IA."""
+        self.piece_values = piece_values
+        self.enabled = enabled
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Zera os contadores de cortes."""
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def new_search(self):
+        """Prepara as tabelas para uma nova busca: apaga os killers e envelhece o histórico."""
+        for killers in self.killers:
+            killers[0] = killers[1] = None
+        for key in list(self.history):
+            self.history[key] >>= 1
+            if not self.history[key]:
+                del self.history[key]
+
+    def order(self, board, legal_moves, ply, hash_move=None):
+        """Retorna a lista de jogadas (peça, casa) ordenada da mais para a menos promissora.
+
+        hash_move é a tupla (índice da origem, índice do destino) guardada na tabela de transposição.
+        """
+        moves = [(piece, move) for piece, possible_moves in legal_moves for move in possible_moves]
+        if not self.enabled:
+            return moves
+        killers = self.killers[ply] if ply < MAX_PLY else (None, None)
+        scores = []
+        for piece, move in moves:
+            origin_and_target = (square_index(piece.square), square_index(move))
+            victim = board.square[move]
+            if origin_and_target == hash_move:
+                score = HASH_MOVE_SCORE
+            elif victim is not None:
+                # MVV-LVA: a vítima mais valiosa primeiro e, entre elas, o atacante menos valioso
+                score = CAPTURE_SCORE + 16 * self.piece_values[victim.kind] - self.piece_values[piece.kind]
+            elif origin_and_target == killers[0]:
+                score = KILLER_SCORE + 1
+            elif origin_and_target == killers[1]:
+                score = KILLER_SCORE
+            else:
+                score = self.history.get((piece.name, origin_and_target[1]), 0)
+            scores.append(score)
+        order = sorted(range(len(moves)), key=scores.__getitem__, reverse=True)
+        return [moves[i] for i in order]
+
+    def record_cutoff(self, board, piece, move, ply, depth, move_number):
+        """Registra a jogada que causou um corte beta, atualizando killers e histórico se ela for quieta."""
+        self.cutoffs += 1
+        if move_number == 0:
+            self.first_move_cutoffs += 1
+        if board.square[move] is not None or ply >= MAX_PLY:
+            return
+        origin_and_target = (square_index(piece.square), square_index(move))
+        killers = self.killers[ply]
+        if killers[0] != origin_and_target:
+            killers[1] = killers[0]
+            killers[0] = origin_and_target
+        key = (piece.name, origin_and_target[1])
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
+    def ordering_quality(self):
+        """Retorna a fração dos cortes que aconteceram na primeira jogada buscada."""
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def stats(self):
+        """Retorna um dicionário com os contadores de cortes e a qualidade da ordenação."""
+        return {
+            "cutoffs": self.cutoffs,
+            "first_move_cutoffs": self.first_move_cutoffs,
+            "ordering_quality": self.ordering_quality(),
+        }
@@ -0,0 +1,133 @@
+import mmap
+import os
+import random
+import struct
+
+from .polyglot_random import RANDOM64
+
+# Cada entrada do livro Polyglot tem 16 bytes big-endian: chave, jogada, peso e aprendizado
+ENTRY = struct.Struct(">QHHI")
+KEY = struct.Struct(">Q")
+
+# Índice Polyglot do tipo de peça (o índice das peças pretas é 2*tipo, o das brancas 2*tipo + 1)
+PIECE_KINDS = {'p': 0, 'n': 1, 'b': 2, 'r': 3, 'q': 4, 'k': 5}
+CASTLING_OFFSETS = {'K': 768, 'Q': 769, 'k': 770, 'q': 771}
+EN_PASSANT_OFFSET = 772
+TURN_OFFSET = 780
+
+
+def polyglot_key(fen):
+    """Calcula a chave Polyglot da posição descrita pelo FEN."""
+    placement, turn, castling, en_passant = fen.split()[:4]
+    key = 0
+    board = {}
+    for row_index, fen_row in enumerate(placement.split('/')):
+        column = 0
+        for char in fen_row:
+            if char.isdigit():
+                column += int(char)
+                continue
+            # No Polyglot a linha 0 é a primeira fileira (a das brancas)
+            row = 7 - row_index
+            kind = 2 * PIECE_KINDS[char.lower()] + (1 if char.isupper() else 0)
+            key ^= RANDOM64[64 * kind + 8 * row + column]
+            board[(column, row)] = char
+            column += 1
+    for char in castling:
+        if char in CASTLING_OFFSETS:
+            key ^= RANDOM64[CASTLING_OFFSETS[char]]
+    # A casa de en passant só entra na chave se algum peão puder capturar nela
+    if en_passant != '-':
+        column = ord(en_passant[0]) - ord('a')
+        pawn, row = ('P', 4) if turn == 'w' else ('p', 3)
+        if board.get((column - 1, row)) == pawn or board.get((column + 1, row)) == pawn:
+            key ^= RANDOM64[EN_PASSANT_OFFSET + column]
+    if turn == 'w':
+        key ^= RANDOM64[TURN_OFFSET]
+    return key
+
+
+def encode_move(initial_pos, move, piece_symbol):
+    """Codifica a jogada (coluna, linha) -> (coluna, linha) do tabuleiro no formato Polyglot.
+
+    O roque é codificado como o rei capturando a própria torre, e o peão que chega à última fileira
+    é promovido a dama, como no jogo.
+    """
+    from_column, from_row = initial_pos[0], 7 - initial_pos[1]
+    to_column, to_row = move[0], 7 - move[1]
+    if piece_symbol == 'k' and abs(to_column - from_column) == 2:
+        to_column = 7 if to_column > from_column else 0
+    promotion = 4 if piece_symbol == 'p' and to_row in (0, 7) else 0
+    return to_column | (to_row << 3) | (from_column << 6) | (from_row << 9) | (promotion << 12)
+
+
+def decode_move(polyglot_move, fen):
+    """Converte uma jogada Polyglot para (casa inicial, casa final) nas coordenadas do tabuleiro."""
+    to_column, to_row = polyglot_move & 7, (polyglot_move >> 3) & 7
+    from_column, from_row = (polyglot_move >> 6) & 7, (polyglot_move >> 9) & 7
+    initial_pos = (from_column, 7 - from_row)
+    move = (to_column, 7 - to_row)
+    # O roque vem como rei para a casa da torre: e1h1 vira e1g1 e e1a1 vira e1c1
+    placement = fen.split()[0].split('/')[initial_pos[1]]
+    column = 0
+    for char in placement:
+        if char.isdigit():
+            column += int(char)
+            continue
+        if column == from_column:
+            if char in 'Kk' and from_column == 4 and to_row == from_row and to_column in (0, 7):
+                move = (6 if to_column == 7 else 2, move[1])
+            break
+        column += 1
+    return initial_pos, move
+
+
+class OpeningBook:
+    """Livro de aberturas no formato Polyglot (.bin), lido por mmap e consultado por busca binária."""
+
+    def __init__(self, path):
+        """Abre o livro; as entradas ficam no arquivo mapeado, sem cópia para a memória do processo."""
+        self.path = path
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.size = size // ENTRY.size
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def entries(self, key):
+        """Retorna a lista de (jogada Polyglot, peso) guardadas para a chave."""
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if KEY.unpack_from(self.data, middle * ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        entries = []
+        while low < self.size:
+            entry_key, move, weight, _ = ENTRY.unpack_from(self.data, low * ENTRY.size)
+            if entry_key != key:
+                break
+            entries.append((move, weight))
+            low += 1
+        return entries
+
+    def get_move(self, fen, random_choice=True):
+        """Retorna (casa inicial, casa final) do livro para a posição ou None se ela não estiver nele.
+
+        Com random_choice a jogada é sorteada com probabilidade proporcional ao peso; sem ele, a de
+        maior peso é escolhida.
+        """
+        entries = [entry for entry in self.entries(polyglot_key(fen)) if entry[1] > 0]
+        if not entries:
+            return None
+        if random_choice:
+            move = random.choices([move for move, _ in entries], [weight for _, weight in entries])[0]
+        else:
+            move = max(entries, key=lambda entry: entry[1])[0]
+        return decode_move(move, fen)
+
+    def close(self):
+        """Fecha o arquivo do livro."""
+        if self.size:
+            self.data.close()
+        self.file.close()
@@ -0,0 +1,131 @@
+import math
+
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# Cada entrada usa duas palavras de 64 bits: a chave da posição (combinada por XOR com os dados) e os
+# dados compactados. Uma escrita interrompida por outro processo produz uma entrada que não confere com a
+# chave e é tratada como ausente, então a tabela pode ser compartilhada sem travas.
+ENTRY_BYTES = 16
+SCORE_SCALE = 100
+SCORE_BIAS = 1 << 31
+
+_SCORE_MASK = 0xFFFFFFFF
+_MOVE_SHIFT, _MOVE_MASK = 32, 0x1FFF
+_DEPTH_SHIFT, _DEPTH_MASK = 45, 0xFF
+_FLAG_SHIFT, _FLAG_MASK = 53, 0x3
+_AGE_SHIFT, _AGE_MASK = 55, 0xFF
+
+
+def table_entries(size_mb):
+    """Retorna o número de entradas (a maior potência de 2) de uma tabela de size_mb megabytes."""
+    entries = max(1, int(size_mb * 1024 * 1024) // ENTRY_BYTES)
+    return 1 << (entries.bit_length() - 1)
+
+
+def table_bytes(size_mb):
+    """Retorna o tamanho em bytes do buffer de uma tabela de size_mb megabytes."""
+    return table_entries(size_mb) * ENTRY_BYTES
+
+
+class TranspositionTable:
+    """Tabela de transposição com tamanho fixo indexada pela chave Zobrist do tabuleiro."""
+
+    def __init__(self, size_mb=16, buffer=None):
+        """Aloca a tabela com o maior número de entradas (potência de 2) que cabe em size_mb.
+
+        Se buffer for informado (por exemplo o buf de uma multiprocessing.shared_memory.SharedMemory com
+        pelo menos table_bytes(size_mb) bytes), as entradas ficam nele em vez de em memória própria.
+        """
+        self.size = table_entries(size_mb)
+        self.mask = self.size - 1
+        if buffer is None:
+            self.buffer = bytearray(self.size * ENTRY_BYTES)
+        else:
+            self.buffer = memoryview(buffer)[:self.size * ENTRY_BYTES]
+        self.table = memoryview(self.buffer).cast('Q')
+        self.age = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Zera os contadores de consultas, acertos e cortes."""
+        self.probes = 0
+        self.hits = 0
+        self.cutoffs = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def clear(self):
+        """Apaga todas as entradas da tabela."""
+        self.buffer[:] = bytes(len(self.buffer))
+        self.age = 0
+
+    def new_search(self):
+        """Marca o início de uma nova busca: entradas de buscas anteriores passam a ser substituíveis."""
+        self.age = (self.age + 1) & _AGE_MASK
+
+    def probe(self, key):
+        """Retorna (profundidade, tipo, pontuação, melhor jogada) da posição ou None se ela não estiver na tabela."""
+        self.probes += 1
+        index = (key & self.mask) << 1
+        data = self.table[index + 1]
+        if not data or self.table[index] ^ data != key:
+            return None
+        self.hits += 1
+        move = (data >> _MOVE_SHIFT) & _MOVE_MASK
+        if move:
+            move = divmod(move - 1, 64)
+        else:
+            move = None
+        score = ((data & _SCORE_MASK) - SCORE_BIAS) / SCORE_SCALE
+        return ((data >> _DEPTH_SHIFT) & _DEPTH_MASK, (data >> _FLAG_SHIFT) & _FLAG_MASK, score, move)
+
+    def store(self, key, depth, flag, score, move=None):
+        """Guarda o resultado da busca de uma posição.
+
+        move é uma tupla (índice da casa de origem, índice da casa de destino). Uma entrada de outra
+        posição só é substituída se for de uma busca antiga ou se tiver profundidade menor ou igual.
+        """
+        if not math.isfinite(score):
+            return
+        index = (key & self.mask) << 1
+        move_bits = 0 if move is None else move[0] * 64 + move[1] + 1
+        old_data = self.table[index + 1]
+        if old_data:
+            if self.table[index] ^ old_data != key:
+                if (((old_data >> _AGE_SHIFT) & _AGE_MASK) == self.age
+                        and ((old_data >> _DEPTH_SHIFT) & _DEPTH_MASK) > depth):
+                    return
+                self.replacements += 1
+            elif move is None:
+                # Mantém a melhor jogada encontrada por uma busca anterior da mesma posição
+                move_bits = (old_data >> _MOVE_SHIFT) & _MOVE_MASK
+        score_bits = max(0, min(_SCORE_MASK, round(score * SCORE_SCALE) + SCORE_BIAS))
+        data = (score_bits | (move_bits << _MOVE_SHIFT) | (min(depth, _DEPTH_MASK) << _DEPTH_SHIFT)
+                | (flag << _FLAG_SHIFT) | (self.age << _AGE_SHIFT))
+        self.table[index] = key ^ data
+        self.table[index + 1] = data
+        self.stores += 1
+
+    def record_cutoff(self):
+        """Conta um corte na busca causado por uma entrada da tabela."""
+        self.cutoffs += 1
+
+    def release(self):
+        """Libera as views sobre o buffer (necessário antes de fechar uma memória compartilhada)."""
+        self.table.release()
+        if isinstance(self.buffer, memoryview):
+            self.buffer.release()
+
+    def stats(self):
+        """Retorna um dicionário com os contadores de uso da tabela."""
+        return {
+            "size": self.size,
+            "probes": self.probes,
+            "hits": self.hits,
+            "cutoffs": self.cutoffs,
+            "stores": self.stores,
+            "replacements": self.replacements,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+        }
@@ -0,0 +1,78 @@
+""" Measure the startup time and the image allocations of the pieces with and without the image cache
+
+The startup is the creation of the 32 pieces of a new game: loading every image from the assets,
+like the pieces did before the cache, against the first game of the process (which builds the
+atlas) and the next ones (which only take the shared surfaces). The allocations are measured as
+the pixel data of the distinct surface buffers behind the images (a subsurface uses the buffer of
+its parent) that did not exist before the pieces of a game, or a new piece like a promoted queen,
+were made.
+
+Run from the src folder: python -m Benchmarks.asset_bench
+"""
+import time
+
+from Game.headless import HeadlessGame
+from piece.images import clear_cache, load_piece_image, piece_image
+
+REPETITIONS = 20
+# The images of the 32 pieces of a new game
+NEW_GAME_IMAGES = [color + kind for color in "wb" for kind in ["p"] * 8 + ["N", "B", "R"] * 2 + ["Q", "K"]]
+
+
+def timed(function):
+    start = time.perf_counter()
+    for _ in range(REPETITIONS):
+        function()
+    return (time.perf_counter() - start) / REPETITIONS
+
+
+def buffers(surfaces):
+    """ Return {id: surface} of the distinct pixel buffers behind the surfaces """
+    roots = (surface.get_abs_parent() for surface in surfaces)
+    return {id(root): root for root in roots}
+
+
+def allocated(surfaces, existing):
+    """ Return the bytes of pixel data of the buffers of the surfaces that are not in existing """
+    return sum(root.get_bytesize() * root.get_width() * root.get_height()
+               for key, root in buffers(surfaces).items() if key not in existing)
+
+
+def main():
+    size = HeadlessGame().settings.square_size
+    names = NEW_GAME_IMAGES
+
+    def uncached():
+        for name in names:
+            load_piece_image(name, size)
+
+    def cold():
+        clear_cache()
+        for name in names:
+            piece_image(name, size)
+
+    def warm():
+        for name in names:
+            piece_image(name, size)
+
+    print(f"Startup of the {len(names)} pieces of a new game:")
+    for label, function in (("load every image", uncached), ("first game (atlas)", cold), ("next games", warm)):
+        print(f"{label:>20}: {timed(function) * 1000:8.3f} ms")
+
+    clear_cache()
+    loaded_game = [load_piece_image(name, size) for name in names]
+    first_game = [piece_image(name, size) for name in names]
+    existing = buffers(first_game)
+    next_game = [piece_image(name, size) for name in names]
+    print("Pixel data allocated for the pieces of a new game:")
+    print(f"{'load every image':>20}: {allocated(loaded_game, {}):8d} bytes")
+    print(f"{'first game (atlas)':>20}: {allocated(first_game, {}):8d} bytes")
+    print(f"{'next games':>20}: {allocated(next_game, existing):8d} bytes")
+
+    existing = buffers(loaded_game + first_game)
+    print("Pixel data allocated per new piece:")
+    print(f"{'load every image':>20}: {allocated([load_piece_image('wQ', size)], existing):8d} bytes")
+    print(f"{'shared surface':>20}: {allocated([piece_image('wQ', size)], existing):8d} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+""" Check that the AI converts the won endings of the tables into mate at the configured depth
+
+Both sides are played by the AI with the KRK, KQK and KPK tables; every game must end in mate
+before the fifty moves rule draws it. The tables are read from the directory given (the one of
+the settings by default) and generated in a temporary directory if they are not there.
+
+Run from the src folder: python -m Benchmarks.endgame_check [tables directory] [depth]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from AI.ai import Ai
+from AI.bitbase import BitbaseGenerator
+from Board.position import Position
+from Game.headless import HeadlessGame
+
+SIGNATURES = ["KRK", "KQK", "KPK"]
+START_POSITIONS = [
+    "8/8/8/4k3/8/8/8/R3K3 w - - 0 1",
+    "8/8/3k4/8/8/8/8/1R2K3 w - - 0 1",
+    "8/8/8/8/3k4/8/8/R5K1 w - - 0 1",
+    "8/8/8/4k3/8/8/8/1Q2K3 w - - 0 1",
+    "8/8/3k4/8/8/8/8/6KQ w - - 0 1",
+    "4k3/8/4K3/4P3/8/8/8/8 w - - 0 1",
+]
+MAX_PLIES = 200
+
+
+def play(fen, depth, directory):
+    """ Play the position AI against AI; return (plies, "mate", "draw" or "no result") """
+    players = {color: Ai(HeadlessGame(), depth, bitbase_path=directory) for color in "wb"}
+    for ai in players.values():
+        ai.reset_position(fen)
+    referee = Position.from_FEN(fen)
+    for plies in range(MAX_PLIES):
+        color = referee.turn
+        if not referee.get_legal_moves(color):
+            return plies, "mate" if referee.in_check(color) else "draw"
+        if referee.fifty_movements >= 100 or referee.repetitions() >= 2:
+            return plies, "draw"
+        initial_pos, move, _ = players[color].get_best_move(None, color)
+        for ai in players.values():
+            ai.play_move(initial_pos, move)
+        referee.play(initial_pos, move)
+    return MAX_PLIES, "no result"
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else HeadlessGame().settings.Bitbase_Path
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else HeadlessGame().settings.AI_depth
+    with tempfile.TemporaryDirectory() as temporary:
+        if not all(os.path.exists(os.path.join(directory, signature + ".dtm")) for signature in SIGNATURES):
+            print(f"Generating {' '.join(SIGNATURES)} in a temporary directory")
+            generator = BitbaseGenerator()
+            for signature in SIGNATURES:
+                generator.generate(signature)
+            for signature, table in generator.tables.items():
+                table.save(os.path.join(temporary, signature + ".bb"))
+            directory = temporary
+        for fen in START_POSITIONS:
+            start = time.perf_counter()
+            plies, result = play(fen, depth, directory)
+            print(f"{fen:>34}: {result} in {plies} plies ({time.perf_counter() - start:.1f}s)")
+            if result != "mate":
+                raise AssertionError(f"The AI did not mate at depth {depth} from {fen}")
+    print(f"Every ending was mated at depth {depth}")
+
+
+if __name__ == "__main__":
+    main()
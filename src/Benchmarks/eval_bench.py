@@ -0,0 +1,84 @@
+""" Compare the scalar and the NumPy batch evaluation of the children of a node
+
+Run from the src folder: python -m Benchmarks.eval_bench [depth]
+"""
+import sys
+import time
+
+from AI.ai import Ai
+from AI.batch_eval import evaluate_children
+from Board.position import Position
+from Game.headless import HeadlessGame
+from .search_bench import POSITIONS, run
+
+REPETITIONS = 200
+# Positions with promotions, castles and captures en passant, checked besides the timed ones
+SPECIAL_MOVE_POSITIONS = [
+    "4k3/P7/8/8/8/8/8/4K3 w - - 0 1",
+    "4k3/8/8/8/8/8/p7/4K3 b - - 0 1",
+    "r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1",
+    "r3k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1",
+    "4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 2",
+    "4k3/8/8/8/3Pp3/8/8/4K3 b - d3 0 1",
+]
+
+
+def scalar_children(ai, board, moves):
+    """ Evaluate the children one by one, making and unmaking each move """
+    scores = []
+    for move in moves:
+        board.fake_push(move)
+        scores.append(ai.evaluate_board(board))
+        board.fake_pop()
+    return scores
+
+
+def position_moves(fen):
+    """ Return the position of the FEN and the moves of its side to move """
+    board = Position.from_FEN(fen)
+    moves = [(piece, move) for piece, possible_moves in board.get_specific_legal_moves(board.turn)
+             for move in possible_moves]
+    return board, moves
+
+
+def check_equivalence(ai, fens):
+    """ Raise AssertionError if the batch and the scalar evaluation of any child differ """
+    for fen in fens:
+        board, moves = position_moves(fen)
+        for (piece, move), batch, scalar in zip(moves, evaluate_children(board, moves),
+                                                 scalar_children(ai, board, moves)):
+            if batch != scalar:
+                raise AssertionError(f"Batch {batch} and scalar {scalar} evaluations of {piece.name} "
+                                     f"{piece.square} -> {move} differ on {fen}")
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    ai = Ai(HeadlessGame(), depth)
+    check_equivalence(ai, POSITIONS + SPECIAL_MOVE_POSITIONS)
+    scalar_time = batch_time = 0
+    children = 0
+    for fen in POSITIONS:
+        board, moves = position_moves(fen)
+        children += len(moves) * REPETITIONS
+
+        start = time.perf_counter()
+        for _ in range(REPETITIONS):
+            scalar_children(ai, board, moves)
+        scalar_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(REPETITIONS):
+            evaluate_children(board, moves)
+        batch_time += time.perf_counter() - start
+
+    print(f"{'scalar':>14}: {scalar_time / children * 1e6:6.2f} us per child")
+    print(f"{'batch':>14}: {batch_time / children * 1e6:6.2f} us per child")
+    for name, options in (("scalar search", {"quiescence": False, "batch_eval": False}),
+                          ("batch search", {"quiescence": False, "batch_eval": True})):
+        nodes, _, elapsed, _ = run(depth, **options)
+        print(f"{name:>14}: {nodes:>9} nodes {elapsed:8.2f}s {nodes / elapsed:8.0f} nps")
+
+
+if __name__ == "__main__":
+    main()
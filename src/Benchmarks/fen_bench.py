@@ -0,0 +1,90 @@
+""" Check that the FEN and EPD codec round-trips exactly and measure its speed in positions per second
+
+Every FEN is read and written back by the codec, by Position and by the sprite Board; any difference
+stops the run. The EPD part writes a temporary file of the given number of lines and streams it back
+with read_EPD.
+
+Run from the src folder: python -m Benchmarks.fen_bench [EPD lines]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from Board.board import Board
+from Board.fen import parse_EPD, parse_FEN, read_EPD, write_EPD, write_FEN
+from Board.position import Position
+from Game.headless import HeadlessGame
+from .perft import REFERENCE_POSITIONS
+from .search_bench import POSITIONS
+
+FENS = [fen for _, fen, _ in REFERENCE_POSITIONS] + POSITIONS + [
+    "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3",
+    "rnbqkbnr/pppp1ppp/8/8/3Pp3/8/PPP1PPPP/RNBQKBNR b Kq d3 0 3",
+    "4k3/8/8/8/8/8/8/4K2R w K - 17 60",
+]
+EPD_LINES = [
+    'r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - bm Qxf7#; id "mate in one";',
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - id position3; perft 1 14;",
+    "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e6",
+]
+REPETITIONS = 2000
+
+
+def check_round_trips():
+    """ Raise AssertionError if any FEN or EPD is not written back exactly as it was read """
+    for fen in FENS:
+        written = {
+            "codec": write_FEN(*parse_FEN(fen)),
+            "Position": Position.from_FEN(fen).to_FEN(),
+            "Board": new_board(fen)._get_FEN_position(),
+        }
+        for reader, text in written.items():
+            if text != fen:
+                raise AssertionError(f"{reader} wrote {text} for {fen}")
+    for line in EPD_LINES:
+        if write_EPD(*parse_EPD(line)) != line:
+            raise AssertionError(f"The EPD codec wrote {write_EPD(*parse_EPD(line))} for {line}")
+
+
+def new_board(fen):
+    board = Board(HeadlessGame())
+    board._init_from_FEN(fen)
+    return board
+
+
+def measure(name, function, arguments):
+    """ Call the function on each argument REPETITIONS times and print the calls per second """
+    start = time.perf_counter()
+    for _ in range(REPETITIONS):
+        for argument in arguments:
+            function(argument)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>24}: {REPETITIONS * len(arguments) / elapsed:9.0f} positions/s")
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    check_round_trips()
+    print(f"{len(FENS)} FEN and {len(EPD_LINES)} EPD records round-trip exactly")
+
+    parsed = [parse_FEN(fen) for fen in FENS]
+    boards = [new_board(fen) for fen in FENS]
+    measure("parse_FEN", parse_FEN, FENS)
+    measure("write_FEN", lambda state: write_FEN(*state), parsed)
+    measure("Position.from_FEN", Position.from_FEN, FENS)
+    measure("Board._get_FEN_position", Board._get_FEN_position, boards)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "positions.epd")
+        with open(path, "w") as file:
+            for index in range(lines):
+                file.write(EPD_LINES[index % len(EPD_LINES)] + "\n")
+        start = time.perf_counter()
+        records = sum(1 for _ in read_EPD(path))
+        elapsed = time.perf_counter() - start
+    print(f"{'read_EPD':>24}: {records / elapsed:9.0f} positions/s ({records} lines streamed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+""" Check the bitboard move generator against the sprite one and compare their speed
+
+A perft walks the move tree of each reference position with fake_push/fake_pop, which play the
+moves with make_move and restore the whole board, and at every node asks both backends for the
+legal moves (get_legal_moves) and the moves used inside the search (get_specific_legal_moves).
+Any difference in the moves found, or a number of leaves other than the published one, stops the
+run.
+
+Run from the src folder: python -m Benchmarks.movegen_bench [depth]
+"""
+import sys
+import time
+
+from .perft import REFERENCE_POSITIONS, board_perft, new_board
+
+
+def move_set(moves):
+    return {(piece.square, move) for piece, possible_moves in moves for move in possible_moves}
+
+
+def generate(board, generator, color):
+    """ Return the legal and the search moves of the color with the given backend """
+    board.move_generator = generator
+    turn, board.turn = board.turn, color
+    moves = board.get_legal_moves(), board.get_specific_legal_moves(color)
+    board.turn = turn
+    return moves
+
+
+def compare(board, color, depth, fen):
+    """ Walk the legal move tree, comparing both backends at every node; return the number of leaves """
+    bitboard_legal, bitboard_search = generate(board, "bitboard", color)
+    sprite_legal, sprite_search = generate(board, "sprites", color)
+    if move_set(bitboard_legal) != move_set(sprite_legal) or move_set(bitboard_search) != move_set(sprite_search):
+        board.print_board()
+        raise AssertionError(f"The move generators differ at depth {depth} below {fen}")
+    if depth == 0:
+        return 1
+    leaves = 0
+    enemy = 'b' if color == 'w' else 'w'
+    for piece, possible_moves in bitboard_legal:
+        for move in possible_moves:
+            board.fake_push((piece, move))
+            leaves += compare(board, enemy, depth - 1, fen)
+            board.fake_pop()
+    return leaves
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    positions = [(name, fen, counts[depth - 1]) for name, fen, counts in REFERENCE_POSITIONS if len(counts) >= depth]
+    for name, fen, expected in positions:
+        board = new_board(fen, "bitboard")
+        leaves = compare(board, board.turn, depth, fen)
+        if leaves != expected:
+            raise AssertionError(f"perft({depth}) of {name} found {leaves} leaves, expected {expected}")
+        print(f"{leaves:>9} leaves, same moves: {fen}")
+
+    for generator in ("sprites", "bitboard"):
+        leaves = 0
+        start = time.perf_counter()
+        for name, fen, expected in positions:
+            board = new_board(fen, generator)
+            board.verify = False
+            leaves += board_perft(board, board.turn, depth)
+        elapsed = time.perf_counter() - start
+        print(f"{generator:>9}: {leaves:>9} leaves {elapsed:8.2f}s {leaves / elapsed:8.0f} leaves/s")
+
+
+if __name__ == "__main__":
+    main()
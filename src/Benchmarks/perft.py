@@ -0,0 +1,149 @@
+""" Perft and divide over the Position the search plays on and over the sprite Board of the game
+
+perft counts the leaves of the legal move tree down to a depth, making and unmaking every move
+with fake_push/fake_pop, so it checks the move generation and the make/unmake together. The
+reference suite holds the published counts of the usual test positions; any other count stops
+the run. The engine only promotes to queen, so the suite keeps to the depths without promotions.
+
+The board mode runs the same suite on the Board with each move generator ("sprites" and
+"bitboard"), playing the moves with make_move and restoring the whole board after each one, so
+it is the check for the changes to Board/board.py and to the pieces.
+
+Run from the src folder:
+    python -m Benchmarks.perft [depth]            the reference suite up to depth
+    python -m Benchmarks.perft board [depth]      the reference suite on the Board, with both generators
+    python -m Benchmarks.perft divide depth FEN   the leaves below each move of the position
+"""
+import sys
+import time
+
+from AI.ai import pv_to_text
+from Board.board import Board
+from Board.position import Position
+from Game.headless import HeadlessGame
+
+# (name, FEN, leaves at depth 1, 2, ...)
+REFERENCE_POSITIONS = [
+    ("Initial position", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+     [20, 400, 8902, 197281]),
+    ("Kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862]),
+    ("Position 3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624]),
+    ("Castling", "r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1",
+     [26, 568, 13744]),
+    ("Position 6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890]),
+]
+
+
+def perft(position, color, depth):
+    """ Return the number of leaves of the legal move tree of the color """
+    moves = position.get_legal_moves(color)
+    # The last ply only needs the number of moves
+    if depth == 1:
+        return sum(len(possible_moves) for _, possible_moves in moves)
+    leaves = 0
+    enemy = 'b' if color == 'w' else 'w'
+    for piece, possible_moves in moves:
+        for move in possible_moves:
+            position.fake_push((piece, move))
+            leaves += perft(position, enemy, depth - 1)
+            position.fake_pop()
+    return leaves
+
+
+def board_perft(board, color, depth):
+    """ Return the number of leaves of the legal move tree of the color on the sprite Board """
+    turn, board.turn = board.turn, color
+    moves = board.get_legal_moves()
+    board.turn = turn
+    if depth == 1:
+        return sum(len(possible_moves) for _, possible_moves in moves)
+    leaves = 0
+    enemy = 'b' if color == 'w' else 'w'
+    for piece, possible_moves in moves:
+        for move in possible_moves:
+            board.fake_push((piece, move))
+            leaves += board_perft(board, enemy, depth - 1)
+            board.fake_pop()
+    return leaves
+
+
+def new_board(fen, generator):
+    """ Return a Board of the FEN with the move generator, checking every fake_pop """
+    board = Board(HeadlessGame())
+    board._init_from_FEN(fen)
+    board.move_generator = generator
+    board.verify = True
+    return board
+
+
+def position_leaves(fen, depth):
+    position = Position.from_FEN(fen)
+    return perft(position, position.turn, depth)
+
+
+def board_leaves(generator):
+    def leaves(fen, depth):
+        board = new_board(fen, generator)
+        return board_perft(board, board.turn, depth)
+    return leaves
+
+
+def divide(position, color, depth):
+    """ Return the leaves below each legal move of the color, as {"e2e4": leaves} """
+    result = {}
+    enemy = 'b' if color == 'w' else 'w'
+    for piece, possible_moves in position.get_legal_moves(color):
+        for move in possible_moves:
+            text = pv_to_text([(piece.square, move)])
+            position.fake_push((piece, move))
+            result[text] = perft(position, enemy, depth - 1) if depth > 1 else 1
+            position.fake_pop()
+    return result
+
+
+def run_suite(max_depth, count_leaves=position_leaves):
+    """ Run perft on the reference positions up to max_depth, printing the nodes per second
+
+    count_leaves(fen, depth) returns the leaves of the position; the Position is used by default.
+    """
+    total_leaves = 0
+    total_time = 0
+    for name, fen, counts in REFERENCE_POSITIONS:
+        print(name, fen)
+        for depth, expected in enumerate(counts[:max_depth], 1):
+            start = time.perf_counter()
+            leaves = count_leaves(fen, depth)
+            elapsed = time.perf_counter() - start
+            print(f"    depth {depth}: {leaves:>9} leaves {elapsed:8.2f}s {leaves / elapsed:9.0f} nodes/s")
+            if leaves != expected:
+                raise AssertionError(f"perft({depth}) of {name} found {leaves} leaves, expected {expected}")
+            total_leaves += leaves
+            total_time += elapsed
+    print(f"All counts match: {total_leaves} leaves {total_time:.2f}s {total_leaves / total_time:.0f} nodes/s")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "divide":
+        depth = int(sys.argv[2])
+        position = Position.from_FEN(" ".join(sys.argv[3:]))
+        start = time.perf_counter()
+        result = divide(position, position.turn, depth)
+        elapsed = time.perf_counter() - start
+        for move, leaves in sorted(result.items()):
+            print(f"{move}: {leaves}")
+        total = sum(result.values())
+        print(f"{len(result)} moves, {total} leaves {elapsed:.2f}s {total / elapsed:.0f} nodes/s")
+    elif len(sys.argv) > 1 and sys.argv[1] == "board":
+        max_depth = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+        for generator in ("sprites", "bitboard"):
+            print(f"Board with the {generator} move generator")
+            run_suite(max_depth, board_leaves(generator))
+    else:
+        run_suite(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
+
+
+if __name__ == "__main__":
+    main()
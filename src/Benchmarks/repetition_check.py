@@ -0,0 +1,57 @@
+""" Check the repetition counts of the Board and of Position on games that lose or keep the castling rights
+
+Each game is played on the sprite Board, the way ChessGame plays the moves, and on a Position with
+play; both must count the repetitions of the final position as expected. Any difference stops the run.
+
+Run from the src folder: python -m Benchmarks.repetition_check
+"""
+from Board.board import Board
+from Board.fen import INITIAL_FEN, NAME_SQUARES
+from Board.position import Position
+from Game.headless import HeadlessGame
+
+KING_WALK = "e2e4 e7e5 e1e2 e8e7 e2e1 e7e8 e1e2 e8e7 e2e1 e7e8"
+KNIGHT_SHUFFLE = "g1f3 g8f6 f3g1 f6g8 g1f3 g8f6 f3g1 f6g8"
+# (moves, repetitions of the final position)
+GAMES = [
+    # The kings come back, but without the castling rights of the first time
+    (KING_WALK, 1),
+    (KING_WALK + " e1e2 e8e7 e2e1 e7e8", 2),
+    (KNIGHT_SHUFFLE, 2),
+    # The position after the double step has an en passant square, so it is repeated only once later
+    ("e2e4 g8f6 g1f3 f6g8 f3g1 g8f6 g1f3 f6g8 f3g1", 1),
+]
+
+
+def board_repetitions(moves):
+    """ Play the moves on the sprite Board and return the repetitions of the final position """
+    board = Board(HeadlessGame())
+    board._reset_all()
+    for move in moves.split():
+        piece = board.get_piece_at_square(NAME_SQUARES[move[:2]])
+        board.history.append(board.zobrist_key)
+        board.make_move(piece, NAME_SQUARES[move[2:]])
+        board.turn = 'b' if board.turn == 'w' else 'w'
+        board._update_zobrist_key()
+    return board.repetitions()
+
+
+def position_repetitions(moves):
+    """ Play the moves on a Position and return the repetitions of the final position """
+    position = Position.from_FEN(INITIAL_FEN)
+    for move in moves.split():
+        position.play(NAME_SQUARES[move[:2]], NAME_SQUARES[move[2:]])
+    return position.repetitions()
+
+
+def main():
+    for moves, expected in GAMES:
+        counts = {"Board": board_repetitions(moves), "Position": position_repetitions(moves)}
+        for model, count in counts.items():
+            if count != expected:
+                raise AssertionError(f"{model} counted {count} repetitions instead of {expected} after {moves}")
+    print(f"{len(GAMES)} games counted the repetitions as expected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+""" Compare the nodes searched by the AI with each search feature turned on and off
+
+The effective branching factor is the depth-th root of the nodes searched per position.
+
+Run from the src folder: python -m Benchmarks.search_bench [depth]
+"""
+import sys
+import time
+
+from AI.ai import Ai
+from Game.headless import HeadlessGame
+
+POSITIONS = [
+    "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1",
+    "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 4 4",
+    "r2q1rk1/pp2bppp/2n1pn2/3p4/3P4/2NBPN2/PP3PPP/R2Q1RK1 b - - 0 10",
+]
+
+
+def run(depth, **options):
+    """ Search every position and return the total nodes, quiescence nodes, time and move ordering quality """
+    nodes = qnodes = 0
+    elapsed = 0
+    cutoffs = first_move_cutoffs = 0
+    for fen in POSITIONS:
+        ai = Ai(HeadlessGame(), depth, **options)
+        start = time.perf_counter()
+        ai.get_best_move(fen, fen.split()[1])
+        elapsed += time.perf_counter() - start
+        nodes += ai.nodes
+        qnodes += ai.qnodes
+        cutoffs += ai.move_orderer.cutoffs
+        first_move_cutoffs += ai.move_orderer.first_move_cutoffs
+    quality = first_move_cutoffs / cutoffs if cutoffs else 0.0
+    return nodes, qnodes, elapsed, quality
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    for name, options in (("no ordering", {"move_ordering": False}),
+                          ("no quiescence", {"quiescence": False}),
+                          ("no pruning", {"null_move": False, "lmr": False, "futility": False}),
+                          ("no null move", {"null_move": False}),
+                          ("no lmr", {"lmr": False}),
+                          ("no futility", {"futility": False}),
+                          ("no pvs", {"pvs": False}),
+                          ("no aspiration", {"aspiration": False}),
+                          ("all", {})):
+        nodes, qnodes, elapsed, quality = run(depth, **options)
+        branching = (nodes / len(POSITIONS)) ** (1 / depth)
+        print(f"{name:>14}: {nodes:>9} nodes ({qnodes:>8} quiescence) {elapsed:8.2f}s "
+              f"{nodes / elapsed:8.0f} nps ebf {branching:5.2f} first-move cutoffs {quality:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+""" Measure the Lazy SMP time-to-depth scaling from 1 to N worker processes
+
+Every run, the 1 worker baseline included, goes through LazySMP, so the speedup compares only the
+number of workers and not the cost of the shared memory table and of the worker processes.
+
+Run from the src folder: python -m Benchmarks.smp_bench [max workers] [depth]
+"""
+import sys
+import time
+
+from AI.lazy_smp import LazySMP
+from .search_bench import POSITIONS
+
+
+def time_to_depth(threads, depth):
+    """ Return the total time and nodes needed to complete the depth on every position """
+    smp = LazySMP(threads, depth)
+    # Start the worker processes before timing and forget what the warm up search stored
+    smp.get_best_move(POSITIONS[0], POSITIONS[0].split()[1], node_limit=1)
+    smp.tt.clear()
+    elapsed = 0
+    nodes = 0
+    try:
+        for fen in POSITIONS:
+            start = time.perf_counter()
+            smp.get_best_move(fen, fen.split()[1])
+            elapsed += time.perf_counter() - start
+            nodes += smp.nodes
+    finally:
+        smp.close()
+    return elapsed, nodes
+
+
+def main():
+    max_threads = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    base_time = None
+    for threads in range(1, max_threads + 1):
+        elapsed, nodes = time_to_depth(threads, depth)
+        base_time = base_time or elapsed
+        print(f"{threads:>2} workers: depth {depth} in {elapsed:7.2f}s {nodes:>9} nodes "
+              f"speedup {base_time / elapsed:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
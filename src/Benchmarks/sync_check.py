@@ -0,0 +1,107 @@
+""" Check that the sprite Board of the game and the Position of the search stay in step
+
+The Board keeps rules of its own (the sprite move generation and the castling, en passant and
+promotion of make_move) besides the Position the AI plays on, so both are played through random
+games, the Board the way ChessGame plays the moves. After every move they must have the same FEN,
+Zobrist key, repetition count and legal moves, with both move generators of the Board. Any
+difference stops the run.
+
+Run from the src folder: python -m Benchmarks.sync_check [games] [plies]
+"""
+import random
+import sys
+
+from Board.board import Board
+from Board.fen import INITIAL_FEN
+from Board.position import Position
+from Game.headless import HeadlessGame
+from .perft import REFERENCE_POSITIONS
+
+# The reference positions and two with pawns ready to capture en passant
+START_POSITIONS = [INITIAL_FEN] + [fen for _, fen, _ in REFERENCE_POSITIONS] + [
+    "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3",
+    "rnbqkbnr/pppp1ppp/8/8/1P1PpP2/8/P1P1P1PP/RNBQKBNR b KQkq d3 0 3",
+]
+SEED = 2024
+
+
+def move_set(moves):
+    return {(piece.square, move) for piece, possible_moves in moves for move in possible_moves}
+
+
+def is_special(position, move):
+    """ Return True if the move is a castle, a capture en passant or a promotion """
+    (column, row), (new_column, new_row) = move
+    piece = position.square[column][row]
+    if piece.kind == "King":
+        return abs(new_column - column) == 2
+    return piece.kind == "Pawn" and (new_row in (0, 7) or
+                                     (new_column != column and position.square[new_column][new_row] is None))
+
+
+def choose_move(position, rng):
+    """ Return a random legal move, a special one half of the times there is one, so the rules where the
+    models differ most are played often """
+    moves = sorted(move_set(position.get_legal_moves()))
+    special = [move for move in moves if is_special(position, move)]
+    return rng.choice(special if special and rng.random() < 0.5 else moves)
+
+
+def play_on_board(board, initial_square, square):
+    """ Play the move on the Board like ChessGame._move """
+    board.history.append(board.zobrist_key)
+    board.make_move(board.get_piece_at_square(initial_square), square)
+    if board.turn == 'w':
+        board.total_turns += 1
+    board.turn = 'b' if board.turn == 'w' else 'w'
+    board._update_zobrist_key()
+
+
+def compare(board, position, moves_played):
+    """ Raise AssertionError if the Board and the Position differ """
+    state = {
+        "FEN": (board._get_FEN_position(), position.to_FEN()),
+        "Zobrist key": (board.zobrist_key, position.zobrist_key),
+        "repetitions": (board.repetitions(), position.repetitions()),
+    }
+    position_moves = move_set(position.get_legal_moves())
+    for generator in ("sprites", "bitboard"):
+        board.move_generator = generator
+        state[f"{generator} moves"] = (move_set(board.get_legal_moves()), position_moves)
+    for name, (board_value, position_value) in state.items():
+        if board_value != position_value:
+            raise AssertionError(f"The {name} of the Board and of the Position differ after {moves_played}: "
+                                 f"{board_value} != {position_value}")
+
+
+def play_game(fen, plies, rng):
+    """ Play a random game from the FEN on both models, comparing them after every move; return the plies played """
+    board = Board(HeadlessGame())
+    board._init_from_FEN(fen)
+    position = Position.from_FEN(fen)
+    moves_played = []
+    compare(board, position, moves_played)
+    for _ in range(plies):
+        if (not position.get_legal_moves() or position.fifty_movements >= 100
+                or position.repetitions() >= 2):
+            break
+        initial_square, square = choose_move(position, rng)
+        moves_played.append((initial_square, square))
+        play_on_board(board, initial_square, square)
+        position.play(initial_square, square)
+        compare(board, position, moves_played)
+    return len(moves_played)
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    plies = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = random.Random(SEED)
+    total = 0
+    for game in range(games):
+        total += play_game(START_POSITIONS[game % len(START_POSITIONS)], plies, rng)
+    print(f"{games} games, {total} moves: the Board and the Position stayed in step")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+from .zobrist import square_index
+
+# Squares are bits of a 64-bit integer, numbered like square_index: column + 8 * row,
+# with row 0 being the black side
+KINDS = ("Pawn", "Knight", "Bishop", "Rook", "Queen", "King")
+SQUARES = [(index % 8, index // 8) for index in range(64)]
+FILES = [sum(1 << (column + 8 * row) for row in range(8)) for column in range(8)]
+PAWN_DIRECTION = {'w': -1, 'b': 1}
+KNIGHT_STEPS = [(2, 1), (2, -1), (1, 2), (-1, 2), (-2, 1), (-2, -1), (-1, -2), (1, -2)]
+KING_STEPS = [(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)]
+ROOK_DIRECTIONS = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+BISHOP_DIRECTIONS = [(1, 1), (-1, 1), (-1, -1), (1, -1)]
+
+
+def _inside(x, y):
+    return 0 <= x < 8 and 0 <= y < 8
+
+
+def _step_table(steps):
+    """ Return, for each square, the bitboard of the squares one step away """
+    table = []
+    for square in range(64):
+        x, y = SQUARES[square]
+        table.append(sum(1 << (x + dx + 8 * (y + dy)) for dx, dy in steps if _inside(x + dx, y + dy)))
+    return table
+
+
+KNIGHT_ATTACKS = _step_table(KNIGHT_STEPS)
+KING_ATTACKS = _step_table(KING_STEPS)
+# Squares attacked by a pawn of each color standing on a square
+PAWN_ATTACKS = {'w': _step_table([(-1, -1), (1, -1)]), 'b': _step_table([(-1, 1), (1, 1)])}
+
+
+def _ray_table(dx, dy):
+    """ Return, for each square, the bitboard of the ray going in the (dx, dy) direction """
+    table = []
+    for square in range(64):
+        x, y = SQUARES[square]
+        ray = 0
+        x, y = x + dx, y + dy
+        while _inside(x, y):
+            ray |= 1 << (x + 8 * y)
+            x, y = x + dx, y + dy
+        table.append(ray)
+    return table
+
+
+def _rays(directions):
+    """ Return the ray tables of the directions, flagged with True when the square index grows along the ray """
+    return [(_ray_table(dx, dy), dy > 0 or (dy == 0 and dx > 0)) for dx, dy in directions]
+
+
+ROOK_RAYS = _rays(ROOK_DIRECTIONS)
+BISHOP_RAYS = _rays(BISHOP_DIRECTIONS)
+
+
+def _between_table():
+    """ Return BETWEEN[a][b], the squares strictly between a and b if they share a line (0 otherwise) """
+    table = [[0] * 64 for _ in range(64)]
+    for square in range(64):
+        for dx, dy in ROOK_DIRECTIONS + BISHOP_DIRECTIONS:
+            x, y = SQUARES[square]
+            between = 0
+            x, y = x + dx, y + dy
+            while _inside(x, y):
+                table[square][x + 8 * y] = between
+                between |= 1 << (x + 8 * y)
+                x, y = x + dx, y + dy
+    return table
+
+
+BETWEEN = _between_table()
+
+
+def _slider_attacks(rays, square, occupied):
+    """ Return the squares reached along the rays until (and including) the first blocker """
+    attacks = 0
+    for table, increasing in rays:
+        ray = table[square]
+        blockers = ray & occupied
+        if blockers:
+            # The nearest blocker is the lowest bit on increasing rays and the highest on the others
+            first = (blockers & -blockers).bit_length() - 1 if increasing else blockers.bit_length() - 1
+            ray ^= table[first]
+        attacks |= ray
+    return attacks
+
+
+def rook_attacks(square, occupied):
+    return _slider_attacks(ROOK_RAYS, square, occupied)
+
+
+def bishop_attacks(square, occupied):
+    return _slider_attacks(BISHOP_RAYS, square, occupied)
+
+
+def queen_attacks(square, occupied):
+    return _slider_attacks(ROOK_RAYS, square, occupied) | _slider_attacks(BISHOP_RAYS, square, occupied)
+
+
+def bits(bitboard):
+    """ Yield the indexes of the bits set in the bitboard """
+    while bitboard:
+        lowest = bitboard & -bitboard
+        yield lowest.bit_length() - 1
+        bitboard ^= lowest
+
+
+def _other(color):
+    return 'b' if color == 'w' else 'w'
+
+
+class BitboardState:
+    """ A bitboard snapshot of a position """
+
+    __slots__ = ("pieces", "occupied", "unmoved", "en_passant")
+
+    def __init__(self):
+        """ Create an empty position """
+        self.pieces = {'w': dict.fromkeys(KINDS, 0), 'b': dict.fromkeys(KINDS, 0)}
+        self.occupied = {'w': 0, 'b': 0}
+        # Pieces that never moved: pawns that can still make the double step, kings and rooks that can castle
+        self.unmoved = 0
+        # Pawns that have just made the double step and can be captured en passant
+        self.en_passant = 0
+
+    @classmethod
+    def from_board(cls, board):
+        """ Take a snapshot of the sprites of the board """
+        state = cls()
+        for group in (board.white_pieces, board.black_pieces):
+            for piece in group:
+                bit = 1 << square_index(piece.square)
+                state.pieces[piece.color][piece.name[1:]] |= bit
+                state.occupied[piece.color] |= bit
+                if not piece.already_moved:
+                    state.unmoved |= bit
+                if getattr(piece, "en_passant", False):
+                    state.en_passant |= bit
+        return state
+
+    def is_attacked(self, square, by_color, occupied, ignored=0):
+        """ Return True if a piece of by_color attacks the square
+
+        occupied is the occupancy to use for the sliding pieces and the pieces of by_color on
+        the ignored squares are not taken into account (they were captured in a trial move).
+        """
+        pieces = self.pieces[by_color]
+        if KNIGHT_ATTACKS[square] & pieces["Knight"] & ~ignored:
+            return True
+        if KING_ATTACKS[square] & pieces["King"] & ~ignored:
+            return True
+        if PAWN_ATTACKS[_other(by_color)][square] & pieces["Pawn"] & ~ignored:
+            return True
+        if rook_attacks(square, occupied) & (pieces["Rook"] | pieces["Queen"]) & ~ignored:
+            return True
+        return bool(bishop_attacks(square, occupied) & (pieces["Bishop"] | pieces["Queen"]) & ~ignored)
+
+    def is_square_attacked(self, square, by_color):
+        """ Return True if a piece of by_color attacks the (column, row) square in this position """
+        return self.is_attacked(square_index(square), by_color, self.occupied['w'] | self.occupied['b'])
+
+    def in_check(self, color):
+        """ Return True if the king of the color is attacked """
+        king = self.pieces[color]["King"]
+        if not king:
+            return False
+        occupied = self.occupied['w'] | self.occupied['b']
+        return self.is_attacked(king.bit_length() - 1, _other(color), occupied)
+
+    def _pawn_pushes(self, color, square, occupied):
+        """ Return the squares the pawn can move forward to """
+        x, y = SQUARES[square]
+        direction = PAWN_DIRECTION[color]
+        pushes = []
+        if _inside(x, y + direction) and not occupied >> (square + 8 * direction) & 1:
+            pushes.append(square + 8 * direction)
+            if (self.unmoved >> square & 1 and _inside(x, y + 2 * direction)
+                    and not occupied >> (square + 16 * direction) & 1):
+                pushes.append(square + 16 * direction)
+        return pushes
+
+    def _piece_moves(self, kind, color, square, occupied):
+        """ Return the squares the piece can move to, captures first, without checking the king safety """
+        enemy = self.occupied[_other(color)]
+        if kind == "Pawn":
+            captures = list(bits(PAWN_ATTACKS[color][square] & enemy))
+            # En passant: an enemy pawn that just made the double step beside this one
+            x, y = SQUARES[square]
+            for enemy_pawn in bits(self.en_passant & self.pieces[_other(color)]["Pawn"]):
+                enemy_x, enemy_y = SQUARES[enemy_pawn]
+                if enemy_y == y and abs(enemy_x - x) == 1:
+                    captures.append(enemy_pawn + 8 * PAWN_DIRECTION[color])
+            return captures + self._pawn_pushes(color, square, occupied)
+        if kind == "Knight":
+            targets = KNIGHT_ATTACKS[square]
+        elif kind == "King":
+            targets = KING_ATTACKS[square]
+        elif kind == "Rook":
+            targets = rook_attacks(square, occupied)
+        elif kind == "Bishop":
+            targets = bishop_attacks(square, occupied)
+        else:
+            targets = queen_attacks(square, occupied)
+        return list(bits(targets & enemy)) + list(bits(targets & ~occupied))
+
+    def _castles(self, color, square, occupied):
+        """ Return the squares the king can castle to, with the rules of King.castle """
+        if not self.unmoved >> square & 1 or self.in_check(color):
+            return []
+        x, y = SQUARES[square]
+        unmoved_rooks = self.pieces[color]["Rook"] & self.unmoved
+        castles = []
+        for rook_offset, empty_squares, safe_squares in ((3, 2, 2), (-4, 3, 2)):
+            direction = 1 if rook_offset > 0 else -1
+            if not 0 <= x + rook_offset < 8 or not unmoved_rooks & FILES[x + rook_offset]:
+                continue
+            if any(occupied >> (square + i * direction) & 1 for i in range(1, empty_squares + 1)):
+                continue
+            if any(self.is_attacked(square + i * direction, _other(color), occupied)
+                   for i in range(1, safe_squares + 1)):
+                continue
+            castles.append(square + 2 * direction)
+        return castles
+
+    def attackers(self, square, by_color, occupied):
+        """ Return the bitboard of the pieces of by_color that attack the square """
+        pieces = self.pieces[by_color]
+        return ((KNIGHT_ATTACKS[square] & pieces["Knight"])
+                | (KING_ATTACKS[square] & pieces["King"])
+                | (PAWN_ATTACKS[_other(by_color)][square] & pieces["Pawn"])
+                | (rook_attacks(square, occupied) & (pieces["Rook"] | pieces["Queen"]))
+                | (bishop_attacks(square, occupied) & (pieces["Bishop"] | pieces["Queen"])))
+
+    def pins(self, color, king_square, occupied):
+        """ Return a dict from each pinned piece of the color to the squares it can still move to
+
+        A piece is pinned when it is the only piece between its king and an enemy slider on the
+        same line; it can only move along the segment between them, capturing the slider included.
+        """
+        enemy_pieces = self.pieces[_other(color)]
+        own = self.occupied[color]
+        pinned = {}
+        for empty_board_attacks, kinds in ((rook_attacks(king_square, 0), ("Rook", "Queen")),
+                                           (bishop_attacks(king_square, 0), ("Bishop", "Queen"))):
+            for slider in bits(empty_board_attacks & (enemy_pieces[kinds[0]] | enemy_pieces[kinds[1]])):
+                between = BETWEEN[king_square][slider]
+                blockers = between & occupied
+                # Exactly one blocker, and it is a piece of the color
+                if blockers and not blockers & (blockers - 1) and blockers & own:
+                    pinned[blockers.bit_length() - 1] = between | (1 << slider)
+        return pinned
+
+    def generate_moves(self, color, legal):
+        """ Return a dict from each square with a piece of the color to the squares it can move to
+
+        With legal only the moves that do not leave the own king attacked are generated, like
+        Piece.possible_captures; otherwise they are all kept, like Piece.possible_movements.
+        Castles are always added at the end of the king moves. Without a king (captured inside
+        the search) there is nothing to keep safe and every move is kept.
+        """
+        occupied = self.occupied['w'] | self.occupied['b']
+        king = self.pieces[color]["King"]
+        if not legal or not king:
+            moves = {}
+            for kind in KINDS:
+                for square in bits(self.pieces[color][kind]):
+                    targets = self._piece_moves(kind, color, square, occupied)
+                    if kind == "King":
+                        targets.extend(self._castles(color, square, occupied))
+                    if targets:
+                        moves[square] = targets
+            return moves
+        return self._legal_moves(color, king.bit_length() - 1, occupied)
+
+    def _legal_moves(self, color, king_square, occupied):
+        """ Generate the legal moves from the checks and pins of the position, without trial moves
+
+        In check by one piece the other pieces must capture it or block the line to the king; in
+        double check only the king moves. The king moves to the squares that stay unattacked
+        once it leaves its square. The captures en passant, which take a pawn away from a square
+        other than the target, are the only moves tested by playing them on the bitboards.
+        """
+        enemy = _other(color)
+        checkers = self.attackers(king_square, enemy, occupied)
+        moves = {}
+
+        king_occupied = occupied & ~(1 << king_square)
+        targets = [target for target in self._piece_moves("King", color, king_square, occupied)
+                   if not self.is_attacked(target, enemy, king_occupied, ignored=1 << target)]
+        if not checkers:
+            targets.extend(self._castles(color, king_square, occupied))
+        if targets:
+            moves[king_square] = targets
+        if checkers & (checkers - 1):
+            return moves
+
+        if checkers:
+            checker = checkers.bit_length() - 1
+            evasions = checkers | BETWEEN[king_square][checker]
+        else:
+            evasions = ~0
+        pinned = self.pins(color, king_square, occupied)
+        for kind in KINDS[:-1]:
+            for square in bits(self.pieces[color][kind]):
+                allowed = evasions & pinned.get(square, ~0)
+                targets = []
+                for target in self._piece_moves(kind, color, square, occupied):
+                    if kind == "Pawn" and (target - square) % 8 and not occupied >> target & 1:
+                        if self._en_passant_is_legal(color, square, target, king_square, occupied):
+                            targets.append(target)
+                    elif allowed >> target & 1:
+                        targets.append(target)
+                if targets:
+                    moves[square] = targets
+        return moves
+
+    def _en_passant_is_legal(self, color, square, target, king_square, occupied):
+        """ Return True if the pawn on square can capture en passant on target without exposing its king """
+        captured = 1 << (target - 8 * PAWN_DIRECTION[color])
+        new_occupied = (occupied & ~(1 << square) & ~captured) | (1 << target)
+        return not self.is_attacked(king_square, _other(color), new_occupied, ignored=captured)
@@ -1,4 +1,5 @@
 import numpy as np
+import pygame
 from piece.pawn import Pawn
 from piece.king import King
 from piece.rook import Rook
@@ -6,9 +7,18 @@ from piece.knight import Knight
 from piece.queen import Queen
 from piece.bishop import Bishop
 from piece.new_game import create_white_pieces, create_black_pieces, FEN_to_board
+from .zobrist import square_index, compute_key, count_repetitions
+from .evaluation import compute_score
+from .fen import CASTLING_SQUARES, parse_FEN, write_FEN
+from .bitboard import BitboardState, SQUARES, KNIGHT_STEPS, KING_STEPS, ROOK_DIRECTIONS, BISHOP_DIRECTIONS
 
 class Board:
-    """ A class to manage the board """
+    """ A class to manage the board
+
+    The Board keeps the sprites of the game and rules of its own (the sprite move generation and the
+    castling, en passant and promotion of make_move) besides the Position the AI searches on;
+    Benchmarks.sync_check plays random games on both to check that they stay in step.
+    """
 
     def __init__(self, ai_game):
         """ Create a new board """
@@ -19,88 +29,35 @@ class Board:
         self.total_turns = 0
         self.last_move = None
         self.PGN = ""
-        self.positions = {}
+        # Zobrist keys of the positions played before the actual one
+        self.history = []
+        # Castling rights in FEN notation and the square a pawn can capture en passant
+        self.castling_rights = "KQkq"
+        self.en_passant_square = None
         self.board_stack = []
         self.game_active = True
-        self.game_active_AI = [True, None]
         self.turn = 'w'
+        # Saved states of the moves made by fake_push, undone by fake_pop
         self.last_move_AI = []
-
-    def _get_position(self):
-        """ Return a string representing the position """
-        actual_position = []
-        for piece in self.white_pieces:
-            if type(piece) is Pawn:
-                piece_status = f"{piece.name}, {piece.square}, {piece.en_passant} "
-            elif type(piece) is King or type(piece) is Rook:
-                piece_status = f"{piece.name}, {piece.square}, {piece.already_moved} "
-            else:
-                piece_status = f"{piece.name}, {piece.square} "
-            actual_position.append(piece_status)
-        for piece in self.black_pieces:
-            if type(piece) is Pawn:
-                piece_status = f"{piece.name}, {piece.square}, {piece.en_passant} "
-            elif type(piece) is King or type(piece) is Rook:
-                piece_status = f"{piece.name}, {piece.square}, {piece.already_moved} "
-            else:
-                piece_status = f"{piece.name}, {piece.square} "
-            actual_position.append(piece_status)
-        return "".join(sorted(actual_position))
+        # With verify, every fake_pop checks that the board is identical to the one before the fake_push
+        self.verify = False
+        self.zobrist_key = 0
+        # Evaluation terms of the actual position, recomputed by fake_push and restored by fake_pop
+        self.piece_square_score = 0
+        self.material = {'w': 0, 'b': 0}
+        # Backend of the move generation: "bitboard" or "sprites"
+        self.move_generator = self.settings.Move_Generator
+        # Legal moves of the actual position, as (position key, moves, {square: squares}); cleared by make_move
+        self.legal_moves_cache = None
 
     def _get_FEN_position(self):
         """ Return a string representing the position in FEN notation """
-        def get_piece_symbol(piece):
-            if isinstance(piece, Pawn):
-                return "P" if piece.color == 'w' else "p"
-            if isinstance(piece, Knight):
-                return "N" if piece.color == 'w' else "n"
-            if isinstance(piece, Bishop):
-                return "B" if piece.color == 'w' else "b"
-            if isinstance(piece, Rook):
-                return "R" if piece.color == 'w' else "r"
-            if isinstance(piece, Queen):
-                return "Q" if piece.color == 'w' else "q"
-            if isinstance(piece, King):
-                return "K" if piece.color == 'w' else "k"
-            return None
-        board_rows = []
-        for row in range(8):
-            empty_squares = 0
-            fen_row = ""
-            for col in range(8):
-                square = (col, row)
-                piece = Board.get_piece_at_square(self, square)
-                if piece is None:
-                    empty_squares += 1
-                else:
-                    if empty_squares > 0:
-                        fen_row += str(empty_squares)
-                        empty_squares = 0
-                    fen_row += get_piece_symbol(piece)
-            if empty_squares > 0:
-                fen_row += str(empty_squares)
-            board_rows.append(fen_row)
-
-        fen_position = "/".join(board_rows)
-
-        active_color = "w" if self.turn == 'w' else "b"
-        castling_rights = ""
-        if len(self.white_king.short_castle(self.white_pieces, self.black_pieces)[0]) > 0:
-            castling_rights += 'K'
-        if len(self.white_king.large_castle(self.white_pieces, self.black_pieces)[0]) > 0:
-            castling_rights += 'Q'
-
-        if len(self.black_king.short_castle(self.white_pieces, self.black_pieces)[0]) > 0:
-            castling_rights += 'k'
-        if len(self.black_king.large_castle(self.white_pieces, self.black_pieces)[0]) > 0:
-            castling_rights += 'q'
-        if len(castling_rights) == 0:
-            castling_rights = "-"
-
-        en_passant_target = '-'
-
-        fen_notation = f"{fen_position} {active_color} {castling_rights} {en_passant_target} {self.fifty_movements} {self.total_turns}"
-        return fen_notation
+        pieces = [(piece.name, piece.square) for piece in self.white_pieces]
+        pieces += [(piece.name, piece.square) for piece in self.black_pieces]
+        # total_turns counts the moves of white, so it is one behind the FEN number while white moves
+        fullmove = self.total_turns + 1 if self.turn == 'w' else self.total_turns
+        return write_FEN(pieces, self.turn, self.castling_rights, self.en_passant_square,
+                         self.fifty_movements, fullmove)
 
     def update_PGN(self, old_pos):
         letter = 'abcdefgh'
@@ -137,20 +94,42 @@ class Board:
             return piece
         return None
     
-    def get_en_passant_target(self):
-        """ Identifica se há algum en passant no jogo e retorna sua coordenada """
-        en_passant_target = '-'
-        friendly_pieces = self.white_pieces if self.turn == "w" else self.black_pieces
-        enemy_pieces = self.white_pieces if self.turn == "b" else self.black_pieces
-        for piece in friendly_pieces:
-            if type(piece) is Pawn:
-                target = piece.move_en_passant(enemy_pieces)
-                if len(target) > 0:
-                    target = target[0]
-                    en_passant_target = self.movement_to_pos((Pawn, target, None))
-                    break
-        return en_passant_target
-    
+    def is_square_attacked(self, square, by_color):
+        """ Return True if a piece of by_color attacks the square
+
+        Looks outward from the square: a knight or king one step away, a pawn on the diagonal
+        behind it and a sliding piece as the first piece along a ray.
+        """
+        x, y = square
+
+        def attacker(column, row, kinds):
+            if not (0 <= column < 8 and 0 <= row < 8):
+                return False
+            piece = self.square[column][row]
+            return piece is not None and piece.color == by_color and type(piece) in kinds
+
+        for dx, dy in KNIGHT_STEPS:
+            if attacker(x + dx, y + dy, (Knight,)):
+                return True
+        for dx, dy in KING_STEPS:
+            if attacker(x + dx, y + dy, (King,)):
+                return True
+        # White pawns move to row 0, so they attack the square from the row below it
+        pawn_row = y + 1 if by_color == 'w' else y - 1
+        if attacker(x - 1, pawn_row, (Pawn,)) or attacker(x + 1, pawn_row, (Pawn,)):
+            return True
+        for directions, kinds in ((ROOK_DIRECTIONS, (Rook, Queen)), (BISHOP_DIRECTIONS, (Bishop, Queen))):
+            for dx, dy in directions:
+                column, row = x + dx, y + dy
+                while 0 <= column < 8 and 0 <= row < 8:
+                    piece = self.square[column][row]
+                    if piece is not None:
+                        if piece.color == by_color and type(piece) in kinds:
+                            return True
+                        break
+                    column, row = column + dx, row + dy
+        return False
+
     def movement_to_pos(self, movement):
         piece, square, _ = movement
         letter = 'abcdefgh'
@@ -181,7 +160,12 @@ class Board:
         self.turn = "w"
         self.active_piece = None
         self.fifty_movements = 0
-        self.positions = {}
+        self.total_turns = 0
+        self.castling_rights = "KQkq"
+        self.en_passant_square = None
+        self.history = []
+        self._update_zobrist_key()
+        self._update_score()
 
         self.game_active = True
 
@@ -189,38 +173,162 @@ class Board:
         """ init a new game from FEN """
         self.white_king, self.white_pieces, self.black_king, self.black_pieces = FEN_to_board(self, FEN)
 
-        self.turn = "w"
+        _, self.turn, self.castling_rights, self.en_passant_square, self.fifty_movements, fullmove = parse_FEN(FEN)
+        self.total_turns = fullmove - 1 if self.turn == 'w' else fullmove
         self.active_piece = None
-        self.fifty_movements = 0
-        self.positions = {}
+        self.history = []
+        self._update_zobrist_key()
+        self._update_score()
 
         self.game_active = True
 
+    def _update_zobrist_key(self):
+        """ Compute the Zobrist key of the actual position from scratch """
+        en_passant_column = self.en_passant_square[0] if self.en_passant_square else None
+        self.zobrist_key = compute_key(self.white_pieces, self.black_pieces, self.turn,
+                                       self.castling_rights, en_passant_column)
+
+    def repetitions(self):
+        """ Return how many times the actual position was played before """
+        return count_repetitions(self.history, self.zobrist_key, self.fifty_movements)
+
+    def _update_score(self):
+        """ Compute the material and piece-square terms of the actual position from scratch """
+        self.piece_square_score, white_material, black_material = compute_score(self.white_pieces, self.black_pieces)
+        self.material = {'w': white_material, 'b': black_material}
+
+    def make_move(self, piece, square):
+        """ Move the piece applying the en passant, castle, capture and promotion rules """
+        friendly_pieces = self.white_pieces if piece.color == "w" else self.black_pieces
+        enemy_pieces = self.white_pieces if piece.color == "b" else self.black_pieces
+        self.legal_moves_cache = None
+
+        # The castling rights are lost when the king or the rook leave their squares or the rook is captured
+        for changed_square in (piece.square, square):
+            for right in CASTLING_SQUARES.get(changed_square, ""):
+                self.castling_rights = self.castling_rights.replace(right, "")
+        self.en_passant_square = None
+        if type(piece) is Pawn and abs(square[1] - piece.square[1]) == 2:
+            self.en_passant_square = (square[0], (square[1] + piece.square[1]) // 2)
+
+        # Capture the piece en passant
+        if type(piece) is Pawn and square in piece.move_en_passant(enemy_pieces):
+            piece.movement((square[0], piece.square[1]))
+            pygame.sprite.groupcollide(friendly_pieces, enemy_pieces, False, True)
+
+        # The en passant capture only be made on the movement inmediately after of the enemy pawn 
+        # makes the double-step move
+        for enemy in enemy_pieces:
+            if type(enemy) is Pawn:
+                enemy.en_passant = False
+
+        if type(piece) is Pawn:
+            if square[1] == piece.square[1] + 2*piece.direction:
+                piece.en_passant = True
+
+        # The next lines is for castle
+        if type(piece) is King: 
+            # Short castle
+            movement, rook = piece.short_castle(self.white_pieces, self.black_pieces)
+            if square in movement:
+                rook.movement((rook.square[0]-2, rook.square[1]))
+                rook.already_moved = True
+            # Large castle
+            movement, rook = piece.large_castle(self.white_pieces, self.black_pieces)
+            if square in movement:
+                rook.movement((rook.square[0]+3, rook.square[1]))
+                rook.already_moved = True
+
+        piece.movement(square)
+        piece.already_moved = True
+
+        # Check the captures
+        capture = pygame.sprite.groupcollide(friendly_pieces, enemy_pieces, False, True)
+
+        if capture or type(piece) is Pawn:
+            self.fifty_movements = 0
+        else:
+            self.fifty_movements += 1
+
+        if type(piece) is Pawn:
+            # The pawn is turned into a queen
+            piece.promotion(friendly_pieces)
+
     def fake_push(self, move):
-        """ Faz um movimento no tabuleiro salvando o estado do jogo anterior """
+        """ Faz um movimento (peça, casa) com make_move, salvando em last_move_AI o estado completo que fake_pop restaura
+
+        Todas as regras de make_move são aplicadas (roque, en passant, promoção, direitos de roque e
+        contagem dos cinquenta lances). A chave Zobrist e os termos da avaliação são recalculados e
+        mudam de lado, mas turn continua o mesmo, como em Position.fake_push.
+        """
         piece, square = move
-        new_move = (piece, piece.square)
-        capture = piece.movement(square)
-        if capture is not None:
-            enemy_pieces = self.white_pieces if capture.color == 'w' else self.black_pieces
-            enemy_pieces.remove(capture)
-            if type(capture) is King:
-                self.game_active_AI = [False, capture.color]
-        self.last_move_AI.append((new_move, capture))
+        record = (
+            [(sprite, sprite.square, sprite.already_moved, getattr(sprite, "en_passant", False))
+             for sprite in self.white_pieces.sprites() + self.black_pieces.sprites()],
+            self.white_pieces.sprites(), self.black_pieces.sprites(),
+            self.castling_rights, self.en_passant_square, self.fifty_movements, self.zobrist_key,
+            self.piece_square_score, dict(self.material), self.snapshot() if self.verify else None,
+        )
+        self.last_move_AI.append(record)
+        self.history.append(self.zobrist_key)
+        self.make_move(piece, square)
+        enemy = 'b' if piece.color == 'w' else 'w'
+        en_passant_column = self.en_passant_square[0] if self.en_passant_square else None
+        self.zobrist_key = compute_key(self.white_pieces, self.black_pieces, enemy,
+                                       self.castling_rights, en_passant_column)
+        self._update_score()
 
     def fake_pop(self):
-        """ Desfaz um movimento do tabuleiro retornando a um estado anteriormente salvo """
-        if len(self.last_move_AI) > 0:
-            old_state = self.last_move_AI.pop()
-            old_piece, old_move = old_state[0]
-            old_piece.movement(old_move)
-            if old_state[1]:
-                enemy_pieces = self.white_pieces if old_state[1].color == 'w' else self.black_pieces
-                enemy_pieces.add(old_state[1])
-                self.square[old_state[1].square] = old_state[1]
+        """ Desfaz o último fake_push, restaurando as peças, os grupos e o estado do jogo salvos """
+        if not self.last_move_AI:
+            return
+        (pieces, white_pieces, black_pieces, self.castling_rights, self.en_passant_square,
+         self.fifty_movements, self.zobrist_key, self.piece_square_score, self.material,
+         snapshot) = self.last_move_AI.pop()
+        self.history.pop()
+        self.square[:, :] = None
+        for piece, square, already_moved, en_passant in pieces:
+            piece.square = square
+            piece.rect.topleft = (square[0] * self.settings.square_size, square[1] * self.settings.square_size)
+            piece.already_moved = already_moved
+            if type(piece) is Pawn:
+                piece.en_passant = en_passant
+            self.square[square] = piece
+        self.white_pieces.empty()
+        self.white_pieces.add(*white_pieces)
+        self.black_pieces.empty()
+        self.black_pieces.add(*black_pieces)
+        self.legal_moves_cache = None
+        if snapshot is not None and snapshot != self.snapshot():
+            raise AssertionError("O tabuleiro mudou depois de desfazer o movimento")
+
+    def snapshot(self):
+        """ Retorna o estado completo do tabuleiro, para compará-lo antes e depois de um movimento """
+        return (tuple((id(piece), piece.name, piece.square, piece.already_moved, getattr(piece, "en_passant", False))
+                      for piece in self.white_pieces.sprites() + self.black_pieces.sprites()),
+                tuple(id(piece) for piece in self.square.flat),
+                self.castling_rights, self.en_passant_square, self.fifty_movements, self.zobrist_key,
+                self.piece_square_score, self.material['w'], self.material['b'], len(self.history))
+
+    def _position_key(self):
+        """ Identifica a posição atual e o gerador de movimentos, para o cache dos movimentos legais """
+        return (self.zobrist_key, self.turn, self.castling_rights, self.en_passant_square, self.move_generator)
+
+    def _cached_legal_moves(self):
+        """ Retorna os movimentos legais do turno atual e o dicionário {casa da peça: casas}, gerando-os uma vez por posição """
+        key = self._position_key()
+        if self.legal_moves_cache is None or self.legal_moves_cache[0] != key:
+            moves = self._generate_legal_moves()
+            self.legal_moves_cache = (key, moves, {piece.square: squares for piece, squares in moves})
+        return self.legal_moves_cache[1], self.legal_moves_cache[2]
 
     def get_legal_moves(self):
-        """ Retorna uma lista com movimentos possíveis do jogador do turno atual """
+        """ Retorna uma lista com movimentos possíveis do jogador do turno atual (não deve ser alterada) """
+        return self._cached_legal_moves()[0]
+
+    def _generate_legal_moves(self):
+        if self.move_generator == "bitboard":
+            return self._bitboard_moves(self.turn, True)
         friendly_pieces = self.white_pieces if self.turn == "w" else self.black_pieces
         king = self.white_king if self.turn == "w" else self.black_king
         legal_moves = []
@@ -232,6 +340,8 @@ class Board:
     
     def get_specific_legal_moves(self, color):
         """ Retorna uma lista com movimentos possíveis do jogador especificado """
+        if self.move_generator == "bitboard":
+            return self._bitboard_moves(color, False)
         friendly_pieces = self.white_pieces if color == 'w' else self.black_pieces
         king = self.white_king if color == 'w' else self.black_king
         legal_moves = []
@@ -240,6 +350,27 @@ class Board:
             if len(possible_captures) > 0:
                 legal_moves.append((piece, possible_captures))
         return legal_moves
+
+    def get_piece_legal_moves(self, piece):
+        """ Retorna a lista de casas para onde a peça pode se mover legalmente """
+        if piece.color == self.turn:
+            return self._cached_legal_moves()[1].get(piece.square, [])
+        if self.move_generator == "bitboard":
+            moves = BitboardState.from_board(self).generate_moves(piece.color, True)
+            return [SQUARES[target] for target in moves.get(square_index(piece.square), [])]
+        king = self.white_king if piece.color == 'w' else self.black_king
+        return piece.possible_captures(self.white_pieces, self.black_pieces, king)
+
+    def _bitboard_moves(self, color, legal):
+        """ Gera os movimentos do jogador com os bitboards, no mesmo formato (peça, [casas]) dos sprites """
+        moves = BitboardState.from_board(self).generate_moves(color, legal)
+        friendly_pieces = self.white_pieces if color == 'w' else self.black_pieces
+        legal_moves = []
+        for piece in friendly_pieces:
+            targets = moves.get(square_index(piece.square))
+            if targets:
+                legal_moves.append((piece, [SQUARES[target] for target in targets]))
+        return legal_moves
     
     def print_board(self):
         for i in range(8):
@@ -0,0 +1,112 @@
+""" Reading and writing of FEN strings and EPD records
+
+The pieces are (name, square) pairs, like ("wPawn", (4, 6)), with the (column, row) squares of the
+board, where row 0 is the eighth rank. The castling rights are kept as the FEN writes them
+("KQkq", "" when there are none) and the en passant square is a square or None.
+"""
+FEN_KINDS = {'p': "Pawn", 'n': "Knight", 'b': "Bishop", 'r': "Rook", 'q': "Queen", 'k': "King"}
+FEN_NAMES = {symbol: ('w' if symbol.isupper() else 'b') + kind
+             for letter, kind in FEN_KINDS.items() for symbol in (letter.upper(), letter)}
+FEN_SYMBOLS = {name: symbol for symbol, name in FEN_NAMES.items()}
+INITIAL_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+# The castling right each rook initial square keeps
+CASTLING_ROOKS = {(7, 7): 'K', (0, 7): 'Q', (7, 0): 'k', (0, 0): 'q'}
+# The castling rights lost when a piece leaves or is captured on each square
+CASTLING_SQUARES = {(4, 7): "KQ", (4, 0): "kq", **CASTLING_ROOKS}
+
+FILES = "abcdefgh"
+RANKS = "87654321"
+SQUARE_NAMES = {(column, row): FILES[column] + RANKS[row] for column in range(8) for row in range(8)}
+NAME_SQUARES = {name: square for square, name in SQUARE_NAMES.items()}
+
+
+def parse_placement(placement):
+    """ Return the pieces of the placement field as a list of (name, square) """
+    pieces = []
+    row = 0
+    column = 0
+    for char in placement:
+        if char == '/':
+            row += 1
+            column = 0
+        elif char in FEN_NAMES:
+            pieces.append((FEN_NAMES[char], (column, row)))
+            column += 1
+        else:
+            column += int(char)
+    return pieces
+
+
+def write_placement(pieces):
+    """ Return the placement field of the (name, square) pieces """
+    grid = [[None] * 8 for _ in range(8)]
+    for name, (column, row) in pieces:
+        grid[row][column] = FEN_SYMBOLS[name]
+    rows = []
+    for symbols in grid:
+        text = ""
+        empty = 0
+        for symbol in symbols:
+            if symbol is None:
+                empty += 1
+            else:
+                if empty:
+                    text += str(empty)
+                    empty = 0
+                text += symbol
+        if empty:
+            text += str(empty)
+        rows.append(text)
+    return "/".join(rows)
+
+
+def parse_FEN(FEN):
+    """ Return (pieces, turn, castling rights, en passant square, halfmove clock, fullmove number) of a FEN """
+    placement, turn, castling_rights, en_passant, halfmove, fullmove = FEN.split()
+    return (parse_placement(placement), turn, "" if castling_rights == '-' else castling_rights,
+            NAME_SQUARES.get(en_passant), int(halfmove), int(fullmove))
+
+
+def write_FEN(pieces, turn, castling_rights, en_passant, halfmove, fullmove):
+    """ Return the FEN of the pieces and the state of the position, the inverse of parse_FEN """
+    return (f"{write_placement(pieces)} {turn} {castling_rights or '-'} "
+            f"{SQUARE_NAMES[en_passant] if en_passant else '-'} {halfmove} {fullmove}")
+
+
+def parse_EPD(line):
+    """ Return (pieces, turn, castling rights, en passant square, operations) of an EPD record
+
+    operations maps each opcode to its operands as written, like {"bm": "Nf3", "id": '"WAC.001"'}.
+    """
+    placement, turn, castling_rights, en_passant, *rest = line.split(None, 4)
+    operations = {}
+    text = rest[0] if rest else ""
+    start = 0
+    quoted = False
+    for index, char in enumerate(text):
+        if char == '"':
+            quoted = not quoted
+        elif char == ';' and not quoted:
+            opcode, _, operands = text[start:index].strip().partition(' ')
+            operations[opcode] = operands.strip()
+            start = index + 1
+    return (parse_placement(placement), turn, "" if castling_rights == '-' else castling_rights,
+            NAME_SQUARES.get(en_passant), operations)
+
+
+def write_EPD(pieces, turn, castling_rights, en_passant, operations=None):
+    """ Return the EPD record of the pieces, the position state and the operations, the inverse of parse_EPD """
+    fields = [write_placement(pieces), turn, castling_rights or '-', SQUARE_NAMES[en_passant] if en_passant else '-']
+    for opcode, operands in (operations or {}).items():
+        fields.append(f"{opcode} {operands};" if operands else f"{opcode};")
+    return " ".join(fields)
+
+
+def read_EPD(path):
+    """ Yield the parsed records of an EPD file one line at a time, skipping blank and comment lines """
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield parse_EPD(line)
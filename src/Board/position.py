@@ -0,0 +1,362 @@
+import numpy as np
+
+from .bitboard import BitboardState, SQUARES, bits
+from .fen import CASTLING_ROOKS, parse_FEN, write_FEN
+from .evaluation import MATERIAL, PIECE_SQUARE, compute_score
+from .zobrist import (PIECE_KEYS, SIDE_KEY, CASTLING_MASKS, square_index, state_key, compute_key,
+                      count_repetitions)
+
+# Undo records allocated up front; the stack grows past it only in very deep lines
+UNDO_SLOTS = 128
+
+
+class PieceRecord:
+    """ A piece of a Position: only its data, without sprite or image """
+
+    __slots__ = ("kind", "color", "name", "square", "already_moved", "en_passant")
+
+    def __init__(self, kind, color, square, already_moved=False, en_passant=False):
+        """ Create a new piece record """
+        self.kind = kind
+        self.color = color
+        self.name = f"{color}{kind}"
+        self.square = square
+        self.already_moved = already_moved
+        self.en_passant = en_passant
+
+    def __repr__(self):
+        return f"PieceRecord({self.name}, {self.square})"
+
+
+class UndoRecord:
+    """ The state fake_pop needs to undo one fake_push, reused from ply to ply """
+
+    __slots__ = ("piece", "from_square", "already_moved", "was_en_passant", "capture", "capture_index",
+                 "rook", "rook_square", "rook_already_moved", "promoted", "cleared_en_passant",
+                 "unmoved", "en_passant", "fifty_movements", "zobrist_key", "piece_square_score",
+                 "material", "snapshot")
+
+
+class Position:
+    """ A chess position that does not depend on pygame, used by the search and the FEN code
+
+    It answers the same queries as the Board the AI used to search on (fake_push/fake_pop, the
+    legal move lists, the Zobrist key and the incremental evaluation terms), with the moves
+    generated from bitboards kept up to date by fake_push/fake_pop. turn is the side the
+    evaluation is seen from and does not change with the moves. history holds the Zobrist keys of
+    the positions before the current one, the game ones first, for the repetition checks.
+
+    With verify, every fake_pop checks that the position is identical to the one before the
+    matching fake_push.
+    """
+
+    __slots__ = ("square", "white_pieces", "black_pieces", "white_king", "black_king", "turn",
+                 "zobrist_key", "piece_square_score", "material", "bitboards", "fifty_movements",
+                 "undo_stack", "ply", "verify", "history", "fullmove")
+
+    def __init__(self, pieces=(), turn='w', fifty_movements=0, history=()):
+        """ Create a position with the piece records """
+        self.square = np.full((8, 8), None, dtype=object)
+        self.white_pieces = []
+        self.black_pieces = []
+        self.white_king = None
+        self.black_king = None
+        self.turn = turn
+        self.bitboards = BitboardState()
+        self.fifty_movements = fifty_movements
+        # The records of the moves made, undo_stack[:ply]
+        self.undo_stack = [UndoRecord() for _ in range(UNDO_SLOTS)]
+        self.ply = 0
+        self.verify = False
+        self.history = list(history)
+        self.fullmove = 1
+        for piece in pieces:
+            self._add(piece)
+        self.zobrist_key = compute_key(self.white_pieces, self.black_pieces, turn) ^ self._state_key()
+        self.piece_square_score, white_material, black_material = compute_score(self.white_pieces, self.black_pieces)
+        self.material = {'w': white_material, 'b': black_material}
+
+    @classmethod
+    def from_FEN(cls, FEN, turn=None, history=()):
+        """ Create the position of a FEN string; turn overrides the side to move of the FEN
+
+        history is the list of the Zobrist keys of the game positions before this one. The pawns out
+        of their initial row, the kings out of their initial square and the rooks without castling
+        rights are marked as already moved, like the sprites of FEN_to_board, and the pawn that made
+        the double step of the en passant square can be captured en passant.
+        """
+        pieces, side, castling_rights, en_passant, halfmove, fullmove = parse_FEN(FEN)
+        # The pawn stands one row past the en passant square: row 3 for black, row 4 for white
+        en_passant_pawn = en_passant and (en_passant[0], 3 if en_passant[1] == 2 else 4)
+        records = []
+        for name, square in pieces:
+            piece = PieceRecord(name[1:], name[0], square)
+            if piece.kind == "Pawn":
+                piece.already_moved = square[1] != (6 if piece.color == 'w' else 1)
+                piece.en_passant = square == en_passant_pawn
+            elif piece.kind == "King":
+                piece.already_moved = square != ((4, 7) if piece.color == 'w' else (4, 0))
+            elif piece.kind == "Rook":
+                piece.already_moved = CASTLING_ROOKS.get(square, '-') not in castling_rights
+            records.append(piece)
+        position = cls(records, turn or side, halfmove, history)
+        position.fullmove = fullmove
+        return position
+
+    def to_FEN(self):
+        """ Return the FEN string of the position with turn to move """
+        bitboards = self.bitboards
+        en_passant = None
+        enemy = 'b' if self.turn == 'w' else 'w'
+        for index in bits(bitboards.en_passant & bitboards.occupied[enemy]):
+            column, row = SQUARES[index]
+            en_passant = (column, row + (1 if enemy == 'w' else -1))
+        pieces = [(piece.name, piece.square) for piece in self.white_pieces + self.black_pieces]
+        return write_FEN(pieces, self.turn, self.castling_rights(), en_passant, self.fifty_movements, self.fullmove)
+
+    def castling_rights(self):
+        """ Return the castling rights in FEN notation ("" if none), from the kings and rooks that never moved """
+        bitboards = self.bitboards
+        castling_rights = ""
+        for right, mask in CASTLING_MASKS.items():
+            pieces = bitboards.pieces['w' if right.isupper() else 'b']
+            if bitboards.unmoved & (pieces["King"] | pieces["Rook"]) & mask == mask:
+                castling_rights += right
+        return castling_rights
+
+    def _state_key(self):
+        """ Return the part of the Zobrist key of the castling rights and of the pawn that can be captured en passant """
+        en_passant_column = None
+        for index in bits(self.bitboards.en_passant):
+            en_passant_column = index & 7
+        return state_key(self.castling_rights(), en_passant_column)
+
+    def _add(self, piece):
+        """ Put the piece record on the board """
+        if piece.color == 'w':
+            self.white_pieces.append(piece)
+            if piece.kind == "King":
+                self.white_king = piece
+        else:
+            self.black_pieces.append(piece)
+            if piece.kind == "King":
+                self.black_king = piece
+        self.square[piece.square] = piece
+        bit = 1 << square_index(piece.square)
+        self.bitboards.pieces[piece.color][piece.kind] |= bit
+        self.bitboards.occupied[piece.color] |= bit
+        if not piece.already_moved:
+            self.bitboards.unmoved |= bit
+        if piece.en_passant:
+            self.bitboards.en_passant |= bit
+
+    def pieces_of(self, color):
+        return self.white_pieces if color == 'w' else self.black_pieces
+
+    def fake_push(self, move):
+        """ Make a move (piece, square) of the search, saving in the undo stack what fake_pop needs
+
+        Applies every rule of Board.make_move: the capture en passant, the rook of the castle,
+        the promotion to queen, the already_moved and en_passant flags and the fifty moves
+        counter. The Zobrist key changes side, but turn stays the same.
+        """
+        piece, square = move
+        if self.ply == len(self.undo_stack):
+            self.undo_stack.append(UndoRecord())
+        record = self.undo_stack[self.ply]
+        self.ply += 1
+        bitboards = self.bitboards
+        from_square = piece.square
+        color = piece.color
+        enemy = 'b' if color == 'w' else 'w'
+
+        record.snapshot = self.snapshot() if self.verify else None
+        record.piece = piece
+        record.from_square = from_square
+        record.already_moved = piece.already_moved
+        record.was_en_passant = piece.en_passant
+        record.unmoved = bitboards.unmoved
+        record.en_passant = bitboards.en_passant
+        record.fifty_movements = self.fifty_movements
+        record.zobrist_key = self.zobrist_key
+        self.history.append(self.zobrist_key)
+        old_state_key = self._state_key()
+        record.piece_square_score = self.piece_square_score
+        record.material = (self.material['w'], self.material['b'])
+
+        # Only the pawns that made the double step just before can be captured en passant
+        record.cleared_en_passant = [self.square[SQUARES[index]]
+                                     for index in bits(bitboards.en_passant & bitboards.occupied[enemy])]
+        for pawn in record.cleared_en_passant:
+            pawn.en_passant = False
+        bitboards.en_passant &= ~bitboards.occupied[enemy]
+
+        # A pawn moving diagonally to an empty square captures en passant the pawn beside it
+        capture_square = square
+        if piece.kind == "Pawn" and square[0] != from_square[0] and self.square[square] is None:
+            capture_square = (square[0], from_square[1])
+        capture = self.square[capture_square]
+        record.capture = capture
+        if capture is not None:
+            enemy_pieces = self.pieces_of(enemy)
+            record.capture_index = enemy_pieces.index(capture)
+            del enemy_pieces[record.capture_index]
+            self._lift(capture)
+            self.material[enemy] -= MATERIAL[capture.name]
+
+        self._move(piece, square)
+        record.rook = None
+        if piece.kind == "King" and abs(square[0] - from_square[0]) == 2:
+            short = square[0] > from_square[0]
+            rook_square = (from_square[0] + (3 if short else -4), from_square[1])
+            rook = self.square[rook_square]
+            if rook is not None:
+                record.rook = rook
+                record.rook_square = rook_square
+                record.rook_already_moved = rook.already_moved
+                self._move(rook, (from_square[0] + (1 if short else -1), from_square[1]))
+                rook.already_moved = True
+                bitboards.unmoved &= ~(1 << square_index(rook_square))
+
+        record.promoted = piece.kind == "Pawn" and square[1] in (0, 7)
+        if record.promoted:
+            self._lift(piece)
+            self._set_kind(piece, "Queen")
+            self._place(piece)
+            self.material[color] += MATERIAL[piece.name] - MATERIAL[f"{color}Pawn"]
+
+        piece.already_moved = True
+        bitboards.unmoved &= ~(1 << square_index(from_square) | 1 << square_index(capture_square))
+        if piece.en_passant:
+            bitboards.en_passant ^= 1 << square_index(from_square) | 1 << square_index(square)
+        if piece.kind == "Pawn" and abs(square[1] - from_square[1]) == 2:
+            piece.en_passant = True
+            bitboards.en_passant |= 1 << square_index(square)
+        if capture is not None or piece.kind == "Pawn" or record.promoted:
+            self.fifty_movements = 0
+        else:
+            self.fifty_movements += 1
+        self.zobrist_key ^= SIDE_KEY ^ old_state_key ^ self._state_key()
+
+    def fake_pop(self):
+        """ Undo the last fake_push """
+        if not self.ply:
+            return
+        self.ply -= 1
+        record = self.undo_stack[self.ply]
+        piece = record.piece
+        if record.promoted:
+            self._lift(piece)
+            self._set_kind(piece, "Pawn")
+            self._place(piece)
+        if record.rook is not None:
+            self._move(record.rook, record.rook_square)
+            record.rook.already_moved = record.rook_already_moved
+        self._move(piece, record.from_square)
+        capture = record.capture
+        if capture is not None:
+            self.pieces_of(capture.color).insert(record.capture_index, capture)
+            self._place(capture)
+        piece.already_moved = record.already_moved
+        piece.en_passant = record.was_en_passant
+        for pawn in record.cleared_en_passant:
+            pawn.en_passant = True
+
+        bitboards = self.bitboards
+        bitboards.unmoved = record.unmoved
+        bitboards.en_passant = record.en_passant
+        self.fifty_movements = record.fifty_movements
+        self.zobrist_key = record.zobrist_key
+        self.history.pop()
+        self.piece_square_score = record.piece_square_score
+        self.material['w'], self.material['b'] = record.material
+        if record.snapshot is not None and record.snapshot != self.snapshot():
+            raise AssertionError(f"The position changed after undoing {piece.name} {record.from_square}")
+
+    def play(self, initial_square, square):
+        """ Play a move of the game: unlike fake_push it can't be undone and it changes turn
+
+        The key of the position before the move stays in the history, for the repetitions.
+        """
+        self.fake_push((self.square[initial_square], square))
+        # The move is part of the game now, so its undo record is given back to the search
+        self.ply -= 1
+        if self.turn == 'b':
+            self.fullmove += 1
+        self.turn = 'b' if self.turn == 'w' else 'w'
+
+    def _lift(self, piece):
+        """ Take the piece off its square, updating the key, the score and the bitboards """
+        index = square_index(piece.square)
+        bit = 1 << index
+        self.bitboards.pieces[piece.color][piece.kind] ^= bit
+        self.bitboards.occupied[piece.color] ^= bit
+        self.zobrist_key ^= PIECE_KEYS[piece.name][index]
+        self.piece_square_score -= PIECE_SQUARE[piece.name][index]
+        self.square[piece.square] = None
+
+    def _place(self, piece):
+        """ Put the piece on its square, updating the key, the score and the bitboards """
+        index = square_index(piece.square)
+        bit = 1 << index
+        self.bitboards.pieces[piece.color][piece.kind] ^= bit
+        self.bitboards.occupied[piece.color] ^= bit
+        self.zobrist_key ^= PIECE_KEYS[piece.name][index]
+        self.piece_square_score += PIECE_SQUARE[piece.name][index]
+        self.square[piece.square] = piece
+
+    def _move(self, piece, square):
+        self._lift(piece)
+        piece.square = square
+        self._place(piece)
+
+    def _set_kind(self, piece, kind):
+        piece.kind = kind
+        piece.name = f"{piece.color}{kind}"
+
+    def snapshot(self):
+        """ Return the complete state of the position, to compare it before and after a move """
+        bitboards = self.bitboards
+        return (tuple((id(piece), piece.name, piece.square, piece.already_moved, piece.en_passant)
+                      for piece in self.white_pieces + self.black_pieces),
+                tuple(id(piece) for piece in self.square.flat),
+                tuple(bitboards.pieces['w'].values()), tuple(bitboards.pieces['b'].values()),
+                bitboards.occupied['w'], bitboards.occupied['b'], bitboards.unmoved, bitboards.en_passant,
+                self.fifty_movements, self.zobrist_key, self.piece_square_score,
+                self.material['w'], self.material['b'])
+
+    def repetitions(self):
+        """ Return how many times the position appeared before since the last irreversible move """
+        return count_repetitions(self.history, self.zobrist_key, self.fifty_movements)
+
+    def _moves(self, color, legal):
+        """ Return the moves of the color as a list of (piece, [squares]), in the order of the pieces """
+        moves = self.bitboards.generate_moves(color, legal)
+        result = []
+        for piece in self.pieces_of(color):
+            targets = moves.get(square_index(piece.square))
+            if targets:
+                result.append((piece, [SQUARES[target] for target in targets]))
+        return result
+
+    def get_legal_moves(self, color=None):
+        """ Return the legal moves of the color (the side to move by default) """
+        return self._moves(color or self.turn, True)
+
+    def get_specific_legal_moves(self, color):
+        """ Return the moves of the color used inside the search, which may leave the king attacked """
+        return self._moves(color, False)
+
+    def is_square_attacked(self, square, by_color):
+        """ Return True if a piece of by_color attacks the (column, row) square """
+        return self.bitboards.is_square_attacked(square, by_color)
+
+    def in_check(self, color):
+        """ Return True if the king of the color is attacked or was captured in the search """
+        if not self.bitboards.pieces[color]["King"]:
+            return True
+        return self.bitboards.in_check(color)
+
+    def _update_zobrist_key(self):
+        """ Compute the Zobrist key of the position from scratch """
+        self.zobrist_key = compute_key(self.white_pieces, self.black_pieces, self.turn) ^ self._state_key()
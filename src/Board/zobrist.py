@@ -0,0 +1,57 @@
+import random
+
+# Fixed seed so the same position always gets the same key between runs
+_random = random.Random(0x1A5C4E55)
+
+PIECE_NAMES = ("wPawn", "wKnight", "wBishop", "wRook", "wQueen", "wKing",
+               "bPawn", "bKnight", "bBishop", "bRook", "bQueen", "bKing")
+
+PIECE_KEYS = {name: [_random.getrandbits(64) for _ in range(64)] for name in PIECE_NAMES}
+SIDE_KEY = _random.getrandbits(64)
+# Positions with the same pieces but other castling rights or en passant file are different positions
+CASTLING_KEYS = {right: _random.getrandbits(64) for right in "KQkq"}
+EN_PASSANT_KEYS = [_random.getrandbits(64) for _ in range(8)]
+# The bits of the king and rook squares that must hold unmoved pieces for each castling right
+CASTLING_MASKS = {'K': 1 << 60 | 1 << 63, 'Q': 1 << 60 | 1 << 56, 'k': 1 << 4 | 1 << 7, 'q': 1 << 4 | 1 << 0}
+
+
+def square_index(square):
+    """ Return the index (0-63) of a (column, row) square """
+    return square[0] + 8 * square[1]
+
+
+def state_key(castling_rights, en_passant_column):
+    """ Return the part of the key of the castling rights ("KQkq" or part of it) and the en passant column (or None) """
+    key = 0
+    for right in castling_rights:
+        key ^= CASTLING_KEYS[right]
+    if en_passant_column is not None:
+        key ^= EN_PASSANT_KEYS[en_passant_column]
+    return key
+
+
+def compute_key(white_pieces, black_pieces, turn, castling_rights="", en_passant_column=None):
+    """ Compute the Zobrist key of a position from scratch """
+    key = state_key(castling_rights, en_passant_column)
+    for piece in white_pieces:
+        key ^= PIECE_KEYS[piece.name][square_index(piece.square)]
+    for piece in black_pieces:
+        key ^= PIECE_KEYS[piece.name][square_index(piece.square)]
+    if turn == 'b':
+        key ^= SIDE_KEY
+    return key
+
+
+def count_repetitions(history, key, fifty_movements):
+    """ Return how many times the key appears in the history since the last irreversible move
+
+    history holds the keys of the positions before the current one, in the order they were played.
+    Only the positions with the same side to move, every second one, are compared, and the scan
+    stops fifty_movements plies back, where the last capture or pawn move was made.
+    """
+    count = 0
+    oldest = max(len(history) - fifty_movements, 0)
+    for index in range(len(history) - 2, oldest - 1, -2):
+        if history[index] == key:
+            count += 1
+    return count
@@ -2,6 +2,7 @@ import pygame
 from Game.settings import Settings
 from GUI.menu_drawer import Menu_Drawer
 from Game.chess import ChessGame
+from Game.frame_pacer import FramePacer
 
 class Menu:
     def __init__(self, window):
@@ -16,17 +17,21 @@ class Menu:
 
         self.running = True
 
-        self.clock = pygame.time.Clock()
+        # The menu never animates, so it only wakes up for the events
+        self.pacer = FramePacer(self.settings.FPS, self.settings.Idle_Wait)
 
     def start(self):
+        needs_draw = True
         while self.running:
-            self.menu_drawer.draw()
+            if needs_draw:
+                self.menu_drawer.draw()
+                needs_draw = False
 
-            self.clock.tick(self.settings.FPS)
-
-            for event in pygame.event.get():
+            for event in self.pacer.wait(False):
                 if event.type == pygame.QUIT:
                     self.running = False
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    needs_draw = True
                 elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
                     self.__handle_lmb_up()
 
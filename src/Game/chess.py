@@ -1,13 +1,13 @@
-import pygame, sys
+import pygame, sys, threading, time
 
+from concurrent.futures import ThreadPoolExecutor
 from pygame.locals import *
 from stockfish import Stockfish
 from .settings import Settings
 from .results import Results
+from .frame_pacer import FramePacer
 from Board.board import Board
-from piece.pawn import Pawn
-from piece.king import King
-from AI.ai import Ai
+from AI.ai import Ai, pv_to_text
 from resource import resource
 
 class ChessGame:
@@ -29,32 +29,90 @@ class ChessGame:
                 self.array.append([0 if j%2 else 1 for j in range(8)])
 
         self.results = Results(self)
-        self.clock = pygame.time.Clock()
+        self.pacer = FramePacer(self.settings.FPS, self.settings.Idle_Wait)
 
         self.board._reset_all()
         self.sound = pygame.mixer.Sound(resource("Assets\chessmove.wav"))
 
         self.active_piece = None
-        self.chess_ai = Ai(self, depth=3)
+        self.chess_ai = Ai(self, depth=self.settings.AI_depth, tt_size_mb=self.settings.TT_size_mb,
+                           threads=self.settings.AI_threads, book_path=self.settings.Book_Path,
+                           bitbase_path=self.settings.Bitbase_Path, contempt=self.settings.AI_Contempt)
+        # The AI keeps its own position, updated with every move played on the board
+        self.chess_ai.reset_position(self.board._get_FEN_position())
         self.stockfish = Stockfish(path= self.settings.StockFish_Path, depth=1)
 
+        # The engines search in a background thread so the window keeps responding
+        self.mode = None
+        self.search_executor = ThreadPoolExecutor(max_workers=1)
+        self.search_future = None
+        self.search_stop = threading.Event()
+        self.search_paused = False
+        self.status_font = pygame.font.SysFont("Comic Sans MS", 24)
+        self.thinking_text = self.status_font.render("Thinking... (Esc to cancel)", True,
+                                                     self.settings.movement_color)
+        self.paused_text = self.status_font.render("Paused (Esc to resume)", True, self.settings.movement_color)
+        # Principal variation of the last engine move
+        self.pv_text = None
+
+        # The empty board is drawn once; each frame only the squares that changed are drawn again
+        self.background = self._render_background()
+        self.full_redraw = True
+        self.results_drawn = False
+        self.drawn_pieces = {}
+        self.drawn_highlights = {}
+        self.drawn_overlays = {}
+        self.highlight_key = None
+        self.highlights = {}
+        # Time spent drawing, for the frame time shown in the window title
+        self.frame_time = 0
+        self.frame_squares = 0
+        self.frames = 0
+        self.frame_report_time = time.perf_counter()
+
     def run_game(self, mode):
         """ Init the game loop """
+        self.mode = mode
         while True:
-            self._check_events()
+            self._check_events(self.pacer.wait(self._is_active()))
             self._update_screen()
             self._auto_move(mode)
-            self.clock.tick(self.settings.FPS)
 
-    def _check_events(self):
+    def _is_active(self):
+        """ Return True if the loop must keep running frames: an engine search is running or about to start """
+        if self.search_future is not None:
+            return True
+        return self.board.game_active and not self.search_paused and self._is_engine_turn(self.mode)
+
+    def _check_events(self, events):
         """ Check the game events """
-        for event in pygame.event.get():
+        for event in events:
             if event.type == QUIT:
-                pygame.quit()
-                sys.exit()
-            elif event.type == MOUSEBUTTONDOWN and self.board.game_active:
+                self._quit()
+            elif event.type == KEYDOWN and event.key == K_ESCAPE:
+                self._toggle_pause()
+            elif event.type in (VIDEOEXPOSE, WINDOWEXPOSED):
+                # The window lost its contents: the board or the results must be drawn again whole
+                self.full_redraw = True
+                self.results_drawn = False
+            elif (event.type == MOUSEBUTTONDOWN and self.board.game_active
+                    and not self._is_engine_turn(self.mode)):
                 self._check_mousebuttondown_events(event)
 
+    def _quit(self):
+        """ Stop the engine search, release the workers and close the game """
+        self.search_stop.set()
+        self.search_executor.shutdown(wait=True)
+        self.chess_ai.close()
+        pygame.quit()
+        sys.exit()
+
+    def _toggle_pause(self):
+        """ Pause the engines, cancelling the running search, or resume them """
+        self.search_paused = not self.search_paused
+        if self.search_paused and self.search_future is not None:
+            self.search_stop.set()
+
     def _check_mousebuttondown_events(self, event):
         """ Respond to mousebuttondown events """
         checked_square = (event.pos[0] // self.settings.square_size,
@@ -62,10 +120,9 @@ class ChessGame:
 
         friendly_pieces = self.board.white_pieces if self.board.turn == "w" else self.board.black_pieces 
         enemy_pieces = self.board.white_pieces if self.board.turn == "b" else self.board.black_pieces
-        king = self.board.white_king if self.board.turn == "w" else self.board.black_king
 
         if self.active_piece: 
-            if checked_square in self.active_piece.possible_captures(self.board.white_pieces, self.board.black_pieces, king):
+            if checked_square in self.board.get_piece_legal_moves(self.active_piece):
                 self._move(friendly_pieces, enemy_pieces, checked_square)
             else:
                 active_piece = None
@@ -89,65 +146,19 @@ class ChessGame:
         """ Move the active piece, realize the captures and change of turn """
         has_capture = self.board.square[square]
         old_pos = self.active_piece.square
-        # The next lines is for the en passant capture 
-
-        # Capture the piece en passant
-        if type(self.active_piece) is Pawn and square in self.active_piece.move_en_passant(enemy_pieces):
-            self.active_piece.movement((square[0], self.active_piece.square[1]))
-            pygame.sprite.groupcollide(friendly_pieces, enemy_pieces, False, True)
-
-        # The en passant capture only be made on the movement inmediately after of the enemy pawn 
-        # makes the double-step move
-        for piece in enemy_pieces:
-            if type(piece) is Pawn:
-                piece.en_passant = False
-
-        if type(self.active_piece) is Pawn:
-            if square[1] == self.active_piece.square[1] + 2*self.active_piece.direction:
-                self.active_piece.en_passant = True
-
-        # The next lines is for castle
-        if type(self.active_piece) is King: 
-            # Short castle
-            movement, rook = self.active_piece.short_castle(self.board.white_pieces, self.board.black_pieces)
-            if square in movement:
-                rook.movement((rook.square[0]-2, rook.square[1]))
-                rook.already_moved = True
-            # Large castle
-            movement, rook = self.active_piece.large_castle(self.board.white_pieces, self.board.black_pieces)
-            if square in movement:
-                rook.movement((rook.square[0]+3, rook.square[1]))
-                rook.already_moved = True
-
-
-        self.active_piece.movement(square)
+        self.board.history.append(self.board.zobrist_key)
+        self.board.make_move(self.active_piece, square)
+        self.chess_ai.play_move(old_pos, square)
         self.sound.play()
-        self.active_piece.already_moved = True
-
-        # Check the captures
-        capture = pygame.sprite.groupcollide(friendly_pieces, enemy_pieces, False, True)
-
-        if capture or type(self.active_piece) is Pawn:
-            self.board.fifty_movements = 0
-        else:
-            self.board.fifty_movements += 1
-
-        if type(self.active_piece) is Pawn:
-            # The pawn is turned into a queen
-            self.active_piece.promotion(friendly_pieces)
 
         if (self.board.turn == 'w'):
             self.board.total_turns += 1
         self.board.last_move = (self.active_piece, square, has_capture)
         self.board.update_PGN(old_pos)
+        self.board.turn = "b" if self.board.turn == "w" else "w"
+        self.board._update_zobrist_key()
         print(self.board._get_FEN_position())
         print(self.board.PGN)
-        actual_position = self.board._get_position()
-        if actual_position in self.board.positions.keys():
-            self.board.positions[actual_position] += 1
-        else:
-            self.board.positions[actual_position] = 1
-        self.board.turn = "b" if self.board.turn == "w" else "w"
         self.active_piece = None
 
         king = self.board.white_king if self.board.turn == "w" else self.board.black_king
@@ -156,9 +167,8 @@ class ChessGame:
 
     def _check_checkmate(self, color, pieces, king):
         """ Check if the king is in checkmate """
-        for piece in pieces:
-            if piece.possible_captures(self.board.white_pieces, self.board.black_pieces, king):
-                return None
+        if self.board.get_legal_moves():
+            return None
 
         if king.check(self.board.white_pieces, self.board.black_pieces):
             winner = "black" if color=="w" else "white"
@@ -168,9 +178,7 @@ class ChessGame:
     def _check_draws(self, pieces, king):
         """ Check if the game is draws """
         # Check stalemate
-        movements = []
-        for piece in pieces:
-            movements.extend(piece.possible_captures(self.board.white_pieces, self.board.black_pieces, king))
+        movements = self.board.get_legal_moves()
         if not movements and not king.check(self.board.white_pieces, self.board.black_pieces):
             self.results.prep("The game is draw for stalemate")
             self.board.game_active = False
@@ -180,73 +188,175 @@ class ChessGame:
             self.results.prep("The game is draw for", "fifty movements rule")
             self.board.game_active = False
 
-        if 3 in self.board.positions.values():
+        if self.board.repetitions() >= 2:
             self.results.prep("The game is draw for repeat", "the same position three times")
             self.board.game_active = False
 
-    def _draw_possible_movements(self):
-        """ Draw circles in the possible movements if there are a active piece """
-        king = self.board.white_king if self.board.turn == "w" else self.board.black_king
-
-        # Draw a rectangle in the active piece square
-        pygame.draw.rect(self.screen, self.settings.active_color, (self.active_piece.square[0]*self.settings.square_size,
-                         self.active_piece.square[1]*self.settings.square_size, self.settings.square_size, 
-                         self.settings.square_size), 5, 1)       
-
-        for movement in self.active_piece.possible_captures(self.board.white_pieces, self.board.black_pieces, king):
-            pygame.draw.circle(self.screen, self.settings.movement_color, ((movement[0]+0.5)*self.settings.square_size, 
-                              (movement[1]+0.5)*self.settings.square_size), self.settings.square_size//3)
-
-    def update(self):
-        """ Draw the board on the screen """
+    def _render_background(self):
+        """ Draw the empty board once on a surface of its own """
+        background = pygame.Surface(self.settings.screen_size)
         for i in range(8):
             for j in range(8):
-                pygame.draw.rect(self.screen, 
-                                 self.settings.light_color if self.array[i][j] else self.settings.dark_color, 
+                pygame.draw.rect(background,
+                                 self.settings.light_color if self.array[i][j] else self.settings.dark_color,
                                  (i*self.square_size, j*self.square_size, self.square_size, self.square_size))
+        return background
+
+    def _get_highlights(self):
+        """ Return {square: "active" or "movement"} for the active piece and its possible movements """
+        if self.active_piece is None:
+            return {}
+        key = (self.active_piece, self.active_piece.square, self.board.zobrist_key)
+        if self.highlight_key != key:
+            self.highlight_key = key
+            self.highlights = {movement: "movement" for movement in self.board.get_piece_legal_moves(self.active_piece)}
+            self.highlights[self.active_piece.square] = "active"
+        return self.highlights
+
+    def _get_overlays(self):
+        """ Return {position: text surface} of the texts drawn over the board """
+        overlays = {}
+        if self.search_paused:
+            overlays[(5, 5)] = self.paused_text
+        elif self.search_future is not None:
+            overlays[(5, 5)] = self.thinking_text
+        if self.pv_text is not None:
+            overlays[(5, self.settings.screen_height - self.pv_text.get_height() - 5)] = self.pv_text
+        return overlays
+
+    def _covered_squares(self, position, surface):
+        """ Return the squares under the surface blitted at position """
+        x, y = position
+        last_column = min(7, (x + surface.get_width() - 1) // self.square_size)
+        last_row = min(7, (y + surface.get_height() - 1) // self.square_size)
+        return {(column, row) for column in range(x // self.square_size, last_column + 1)
+                for row in range(y // self.square_size, last_row + 1)}
+
+    def _draw_square(self, square, image, highlight):
+        """ Draw the board square again with its highlight and piece; return its rect """
+        rect = pygame.Rect(square[0]*self.square_size, square[1]*self.square_size, self.square_size, self.square_size)
+        self.screen.blit(self.background, rect, rect)
+        if highlight == "active":
+            pygame.draw.rect(self.screen, self.settings.active_color, rect, 5, 1)
+        elif highlight == "movement":
+            pygame.draw.circle(self.screen, self.settings.movement_color, rect.center, self.square_size//3)
+        if image is not None:
+            self.screen.blit(image, rect)
+        return rect
+
+    def _draw_board(self):
+        """ Draw the squares that changed since the last frame and return their rects """
+        pieces = {piece.square: piece.image for piece in self.board.white_pieces}
+        pieces.update((piece.square, piece.image) for piece in self.board.black_pieces)
+        highlights = self._get_highlights()
+        overlays = self._get_overlays()
+
+        if self.full_redraw or not self.settings.Dirty_Rendering:
+            dirty = {(column, row) for column in range(8) for row in range(8)}
+            self.full_redraw = False
+            # The whole board covers the results panel, so it is drawn again when the game ends
+            self.results_drawn = False
+        else:
+            dirty = {square for square in pieces.keys() | self.drawn_pieces.keys()
+                     if pieces.get(square) is not self.drawn_pieces.get(square)}
+            dirty |= {square for square in highlights.keys() | self.drawn_highlights.keys()
+                      if highlights.get(square) != self.drawn_highlights.get(square)}
+            for position, surface in self.drawn_overlays.items():
+                if overlays.get(position) is not surface:
+                    dirty |= self._covered_squares(position, surface)
+        # A text is drawn again whole, so every square under it is cleared first
+        redrawn_overlays = []
+        for position, surface in overlays.items():
+            covered = self._covered_squares(position, surface)
+            if self.drawn_overlays.get(position) is not surface or covered & dirty:
+                dirty |= covered
+                redrawn_overlays.append((surface, position))
+
+        rects = [self._draw_square(square, pieces.get(square), highlights.get(square)) for square in dirty]
+        for surface, position in redrawn_overlays:
+            self.screen.blit(surface, position)
+        self.drawn_pieces = pieces
+        self.drawn_highlights = dict(highlights)
+        self.drawn_overlays = overlays
+        return rects
 
     def _update_screen(self):
-        """ Show the screen """
-        self.screen.fill((0,0,0))
-
+        """ Show the screen, sending to the display only the rects that changed """
+        start = time.perf_counter()
         if self.board.game_active:
-            self.update()
-
-            if self.active_piece:
-                self._draw_possible_movements()
-
-            self.board.white_pieces.draw(self.screen)
-            self.board.black_pieces.draw(self.screen)
+            rects = self._draw_board()
+            if rects:
+                pygame.display.update(rects)
         else:
-            self.results.update()
-
-        pygame.display.update()
+            rects = []
+            if not self.results_drawn:
+                self.screen.fill((0,0,0))
+                self.results.update()
+                pygame.display.update()
+                self.results_drawn = True
+                # The results cleared the screen, so a new game starts drawing the whole board
+                self.full_redraw = True
+        self._count_frame(time.perf_counter() - start, len(rects))
+
+    def _count_frame(self, elapsed, squares):
+        """ Show in the window title the mean time and squares drawn per frame of the last second and the CPU use """
+        self.frame_time += elapsed
+        self.frame_squares += squares
+        self.frames += 1
+        now = time.perf_counter()
+        if self.settings.Show_Frame_Time and now - self.frame_report_time >= 1:
+            pygame.display.set_caption(f"Chess Game - {1000 * self.frame_time / self.frames:.3f} ms/frame, "
+                                       f"{self.frame_squares / self.frames:.2f} squares/frame, {self.pacer.report()}")
+            self.frame_time = 0
+            self.frame_squares = 0
+            self.frames = 0
+            self.frame_report_time = now
+
+    def _is_engine_turn(self, mode):
+        """ Return True if the player of the actual turn is an engine """
+        return mode == "AI" or self.board.turn == 'b'
 
     def _auto_move(self, mode):
+        """ Start the engine search on its turn and play the move once the search finishes """
         if self.board.game_active == False:
             return
-        if mode == "human":
-            if self.board.turn == 'b':
-                friendly_pieces = self.board.white_pieces if self.board.turn == "w" else self.board.black_pieces 
-                enemy_pieces = self.board.white_pieces if self.board.turn == "b" else self.board.black_pieces
-                initial_pos, move = self.chess_ai.get_best_move(self.board._get_FEN_position(), 'b')
-                piece_to_move = self.board.get_piece_at_square(initial_pos)
-                self.active_piece = piece_to_move
-                self._move(friendly_pieces, enemy_pieces, move)
-        elif mode == "AI":
-            if self.board.turn == 'b':
-                friendly_pieces = self.board.white_pieces if self.board.turn == "w" else self.board.black_pieces 
-                enemy_pieces = self.board.white_pieces if self.board.turn == "b" else self.board.black_pieces
-                initial_pos, move = self.chess_ai.get_best_move(self.board._get_FEN_position(), 'b')
-                piece_to_move = self.board.get_piece_at_square(initial_pos)
-                self.active_piece = piece_to_move
-                self._move(friendly_pieces, enemy_pieces, move)
-            else:
-                friendly_pieces = self.board.white_pieces if self.board.turn == "w" else self.board.black_pieces 
-                enemy_pieces = self.board.white_pieces if self.board.turn == "b" else self.board.black_pieces
-                self.stockfish.set_fen_position(self.board._get_FEN_position())
-                move = self.stockfish.get_best_move()
-                if move:
-                    piece_to_move = self.board.get_piece_at_square(self.board.pos_to_movement(move[0:2]))
-                    self.active_piece = piece_to_move
-                    self._move(friendly_pieces, enemy_pieces, self.board.pos_to_movement(move[2:4]))
+        if self.search_future is not None:
+            if not self.search_future.done():
+                return
+            move = self.search_future.result()
+            self.search_future = None
+            # A cancelled search is discarded
+            if move and not self.search_paused:
+                initial_pos, square, pv = move
+                self.pv_text = self.status_font.render("PV: " + pv_to_text(pv), True, self.settings.movement_color)
+                self._play_engine_move(initial_pos, square)
+            return
+        if self.search_paused or not self._is_engine_turn(mode):
+            return
+
+        self.search_stop.clear()
+        if mode == "AI" and self.board.turn == 'w':
+            self.search_future = self.search_executor.submit(self._stockfish_search, self.board._get_FEN_position())
+        else:
+            self.search_future = self.search_executor.submit(self._ai_search)
+
+    def _ai_search(self):
+        """ Search the AI move on its own position (runs in the search thread) """
+        return self.chess_ai.get_best_move(None, 'b', time_limit=self.settings.AI_time_limit,
+                                           stop_event=self.search_stop)
+
+    def _stockfish_search(self, fen):
+        """ Search the Stockfish move (runs in the search thread) """
+        self.stockfish.set_fen_position(fen)
+        move = self.stockfish.get_best_move()
+        if not move:
+            return None
+        initial_pos, square = self.board.pos_to_movement(move[0:2]), self.board.pos_to_movement(move[2:4])
+        return initial_pos, square, [(initial_pos, square)]
+
+    def _play_engine_move(self, initial_pos, move):
+        """ Play the move found by an engine """
+        friendly_pieces = self.board.white_pieces if self.board.turn == "w" else self.board.black_pieces 
+        enemy_pieces = self.board.white_pieces if self.board.turn == "b" else self.board.black_pieces
+        self.active_piece = self.board.get_piece_at_square(initial_pos)
+        self._move(friendly_pieces, enemy_pieces, move)
@@ -0,0 +1,48 @@
+import time
+
+import pygame
+
+
+class FramePacer:
+    """ Paces a pygame loop: it sleeps until an event arrives while idle and caps the frame rate while active """
+
+    def __init__(self, active_fps, idle_wait):
+        """ Create a pacer with the frame cap of the active state and the longest wait (ms) of the idle one """
+        self.active_fps = active_fps
+        self.idle_wait = idle_wait
+        self.clock = pygame.time.Clock()
+        # CPU and wall time spent in each state, to compare them
+        self.cpu_time = {"idle": 0.0, "active": 0.0}
+        self.wall_time = {"idle": 0.0, "active": 0.0}
+        self.last_cpu = time.process_time()
+        self.last_wall = time.perf_counter()
+
+    def wait(self, active):
+        """ Wait for the next frame and return its events
+
+        Active, the frame comes at most active_fps times per second; idle, the loop blocks until an
+        event arrives or idle_wait milliseconds pass.
+        """
+        if active:
+            self.clock.tick(self.active_fps)
+            events = pygame.event.get()
+        else:
+            event = pygame.event.wait(self.idle_wait)
+            events = [] if event.type == pygame.NOEVENT else [event] + pygame.event.get()
+            # The clock must not count the idle wait as the time of a frame
+            self.clock.tick()
+
+        cpu, wall = time.process_time(), time.perf_counter()
+        state = "active" if active else "idle"
+        self.cpu_time[state] += cpu - self.last_cpu
+        self.wall_time[state] += wall - self.last_wall
+        self.last_cpu, self.last_wall = cpu, wall
+        return events
+
+    def cpu_use(self, state):
+        """ Return the fraction of one core the process used in the state """
+        return self.cpu_time[state] / self.wall_time[state] if self.wall_time[state] else 0.0
+
+    def report(self):
+        """ Return the CPU use of the idle and active states as text """
+        return f"CPU idle {100 * self.cpu_use('idle'):.1f}%, active {100 * self.cpu_use('active'):.1f}%"
@@ -0,0 +1,10 @@
+from .settings import Settings
+
+
+class HeadlessGame:
+    """ A minimal game object that lets a Board be created without opening a window """
+
+    def __init__(self):
+        """ Create a game instance without screen """
+        self.settings = Settings()
+        self.screen = None
@@ -18,6 +18,30 @@ class Settings:
         self.active_color = (0,255,0)
         self.text_color = (255,255,255)
 
-        self.FPS = 500
+        # Frame cap while the engine thinks; when nothing happens the loop sleeps until an event
+        # arrives or Idle_Wait milliseconds pass
+        self.FPS = 60
+        self.Idle_Wait = 1000
+        # Draw only the squares that changed each frame (False draws the whole board every frame)
+        self.Dirty_Rendering = True
+        # Show in the window title the time spent drawing each frame
+        self.Show_Frame_Time = True
+
+        # Nominal AI search depth; captures past it are resolved by the quiescence search
+        self.AI_depth = 2
+        # Size in megabytes of the AI transposition table
+        self.TT_size_mb = 16
+        # Time in seconds for each AI move (None searches to the fixed depth)
+        self.AI_time_limit = None
+        # Number of processes of the parallel (Lazy SMP) AI search
+        self.AI_threads = 1
+        # Score the AI gives up to avoid a draw by repetition (a pawn is worth 10)
+        self.AI_Contempt = 5
+        # Polyglot opening book consulted before the AI search (ignored if the file does not exist)
+        self.Book_Path = resource("Assets/book.bin")
+        # Directory of the endgame tables generated by AI.bitbase (ignored if it does not exist)
+        self.Bitbase_Path = resource("Assets/bitbases")
+        # Move generation backend of the board: "bitboard" or "sprites" (the pieces' own methods)
+        self.Move_Generator = "bitboard"
 
         self.StockFish_Path = resource("stockfish\stockfish-windows-x86-64-avx2.exe")
\ No newline at end of file
@@ -0,0 +1,42 @@
+""" Process-wide cache of the piece images
+
+The 12 piece images are loaded and scaled once per square size into a single atlas surface, one
+column per image; each piece gets a subsurface of the atlas, so all the pieces of the same kind
+share the pixels instead of loading their own copy of the file.
+"""
+import pygame
+from resource import resource
+
+PIECE_IMAGES = ["wp", "wN", "wB", "wR", "wQ", "wK", "bp", "bN", "bB", "bR", "bQ", "bK"]
+
+# Square size -> {image name: subsurface of the atlas}
+_cache = {}
+
+
+def load_piece_image(image, size):
+    """ Load the image of the piece from the assets scaled to size x size, without the cache """
+    return pygame.transform.scale(pygame.image.load(resource(f"Assets/{image}.png")), (size, size))
+
+
+def build_atlas(size):
+    """ Return the atlas with the 12 piece images of size x size side by side """
+    atlas = pygame.Surface((size * len(PIECE_IMAGES), size), pygame.SRCALPHA)
+    for column, image in enumerate(PIECE_IMAGES):
+        atlas.blit(load_piece_image(image, size), (column * size, 0))
+    return atlas
+
+
+def piece_image(image, size):
+    """ Return the shared surface of the piece image for the square size, building the atlas on first use """
+    images = _cache.get(size)
+    if images is None:
+        atlas = build_atlas(size)
+        images = {name: atlas.subsurface((column * size, 0, size, size))
+                  for column, name in enumerate(PIECE_IMAGES)}
+        _cache[size] = images
+    return images[image]
+
+
+def clear_cache():
+    """ Forget the loaded atlases, so the next piece loads the images again """
+    _cache.clear()
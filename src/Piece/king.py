@@ -91,25 +91,18 @@ class King(Piece):
 
     def there_are_no_checks(self, white_pieces, black_pieces, actual_square, number_of_squares, direction):
         """ Return True if there are no checks between the actual square and a number of squares"""
-        enemy_pieces = white_pieces if self.color == "b" else black_pieces
-        squares = []
+        enemy_color = "b" if self.color == "w" else "w"
 
         for i in range(number_of_squares):
-            squares.append((actual_square[0]+(i+1)*direction, actual_square[1]))
-
-        for piece in enemy_pieces:
-            for square in squares:
-                if square in piece.theoretical_movements(white_pieces, black_pieces):
-                    return False
+            square = (actual_square[0]+(i+1)*direction, actual_square[1])
+            if self.ai_game.is_square_attacked(square, enemy_color):
+                return False
         return True
 
     def check(self, white_pieces, black_pieces):
         """ Check if the king is in check """
-        enemy_pieces = white_pieces if self.color == "b" else black_pieces 
-        for piece in enemy_pieces:
-            if self.square in piece.theoretical_movements(white_pieces, black_pieces):
-                return True
-        return False
+        enemy_color = "b" if self.color == "w" else "w"
+        return self.ai_game.is_square_attacked(self.square, enemy_color)
 
     def possible_movements(self, white_pieces, black_pieces, king):
         possible_movements = super().possible_movements(white_pieces, black_pieces, self)
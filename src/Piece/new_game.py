@@ -1,5 +1,7 @@
 from pygame.sprite import Group
 
+from Board.position import Position
+
 from .pawn import Pawn
 from .king import King
 from .bishop import Bishop
@@ -67,66 +69,33 @@ def create_black_pieces(ai_game):
 def FEN_to_board(ai_game, FEN):
     """Converts FEN notation to white and black pieces groups"""
     piece_mapping = {
-        'r': Rook,
-        'n': Knight,
-        'b': Bishop,
-        'q': Queen,
-        'k': King,
-        'p': Pawn,
-        'R': Rook,
-        'N': Knight,
-        'B': Bishop,
-        'Q': Queen,
-        'K': King,
-        'P': Pawn,
+        "Rook": Rook,
+        "Knight": Knight,
+        "Bishop": Bishop,
+        "Queen": Queen,
+        "King": King,
+        "Pawn": Pawn,
     }
 
-    board_position, _, castling_rights, _, _, _ = FEN.split()
+    # The position is read by Position, the sprites only mirror its pieces
+    position = Position.from_FEN(FEN)
 
     white_pieces = Group()
     black_pieces = Group()
-    row = 0  # Start from the bottom row for white pieces
-    col = 0
-
-    for char in board_position:
-        if char.isdigit():
-            col += int(char)
-        elif char == '/':
-            row += 1
-            col = 0
+    for record in position.white_pieces + position.black_pieces:
+        piece = piece_mapping[record.kind](ai_game, record.square, record.color)
+        piece.already_moved = record.already_moved
+        if record.kind == "Pawn":
+            piece.en_passant = record.en_passant
+        if record.color == 'w':
+            white_pieces.add(piece)
         else:
-            piece_class = piece_mapping[char]
-            piece_color = 'w' if char.isupper() else 'b'
-            piece = piece_class(ai_game, (col, row), piece_color)
-            if (piece_color == 'w'):
-                if type(piece) is Pawn and row != 6:
-                    piece.already_moved = True
-                if type(piece) is King:
-                    if (col, row) != (7, 4):
-                        piece.already_moved = True
-                    white_king = piece
-                white_pieces.add(piece)            
+            black_pieces.add(piece)
+        if type(piece) is King:
+            if record.color == 'w':
+                white_king = piece
             else:
-                if type(piece) is Pawn and row != 1:
-                    piece.already_moved = True
-                if type(piece) is King:
-                    if (col, row) != (0, 4):
-                        piece.already_moved = True
-                    black_king = piece
-                black_pieces.add(piece)
-            ai_game.square[(col, row)] = piece
-            col += 1
-    
-    if 'K' not in castling_rights:
-        r_rook = ai_game.square[(0, 7)]
-        if r_rook:
-            if type(r_rook) is Rook:
-                r_rook.already_moved = True
-    if 'Q' not in castling_rights:
-        l_rook = ai_game.square[(0, 0)]
-        if l_rook:
-            if type(l_rook) is Rook:
-                l_rook.already_moved = True
-            
+                black_king = piece
+        ai_game.square[record.square] = piece
 
     return white_king, white_pieces, black_king, black_pieces
@@ -64,6 +64,12 @@ class Pawn(Piece):
             pieces.add(Queen(self.ai_game, self.square, self.color))
             pieces.remove(self)
 
+    def en_passant_capture(self, movement, enemy_pieces):
+        """ Return the pawn captured en passant by the movement, if any """
+        if self.ai_game.square[movement] is None and movement in self.move_en_passant(enemy_pieces):
+            return self.ai_game.square[movement[0]][self.square[1]]
+        return None
+
     def move_en_passant(self, enemy_pieces):
         movements = []
         for piece in enemy_pieces:
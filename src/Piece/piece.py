@@ -1,6 +1,5 @@
-import pygame
 from pygame.sprite import Sprite
-from resource import resource
+from .images import piece_image
 
 class Piece(Sprite):
     """ A class parent for pieces """
@@ -14,11 +13,8 @@ class Piece(Sprite):
 
         self.square = square
 
-
-
-        self.image = pygame.image.load(resource(f"Assets\{image}.png"))
-        self.image = pygame.transform.scale(self.image, (self.settings.square_size,
-                                                         self.settings.square_size))
+        # The surface is shared by all the pieces of the same kind, so it must not be drawn on
+        self.image = piece_image(image, self.settings.square_size)
         self.rect = self.image.get_rect()
         self.movement(self.square)
 
@@ -77,18 +73,29 @@ class Piece(Sprite):
             movx, movy = movement
             if movx >= 8 or movy >= 8 or movy < 0 or movx < 0:
                  continue
+            en_passant = self.en_passant_capture(movement, enemy_pieces)
             capture = self.movement(movement)
 
             # If there are a capture delete the piece temporarily
             if capture:
                 enemy_pieces.remove(capture)
+            if en_passant:
+                enemy_pieces.remove(en_passant)
+                self.ai_game.square[en_passant.square] = None
 
             if not king.check(white_pieces, black_pieces):
                     possible_movements.append(movement)
 
             if capture:
                 enemy_pieces.add(capture)
+            if en_passant:
+                enemy_pieces.add(en_passant)
+                self.ai_game.square[en_passant.square] = en_passant
             self.movement(real_square)
             self.ai_game.square[movement] = capture
 
-        return possible_movements
\ No newline at end of file
+        return possible_movements
+
+    def en_passant_capture(self, movement, enemy_pieces):
+        """ Return the piece captured en passant by the movement, if any """
+        return None
\ No newline at end of file